@@ -18,20 +18,71 @@ Classes
 -------
 QPUBackend
     Class to manage execution of quantum circuits on a Quantum Processing Unit.
+
+AsyncQPUBackend
+    QPUBackend whose runs are awaited on an asyncio event loop.
 """
 
-import json
+import asyncio
+import functools
 import logging
 import re
+import socket
+import threading
 import time
-from typing import Optional, Union
+from typing import Iterable, Optional, Union
 
 from config import ZMQ_SERVER
-from qmio.clients import SlurmClient, ZMQClient
-from qmio.utils import run, time_within_time_limit
+from qmio.clients import AsyncZMQClient, SlurmClient, ZMQClient
+from qmio.utils import time_within_time_limit, wait_until
 
 logger = logging.getLogger(__name__)
 
+_ENDPOINT_RE = re.compile(r"tcp://(\d+\.\d+\.\d+\.\d+):(\d+)")
+
+
+# CompilerConfig json understood by the control server. Only the scalar
+# values change between runs, so the document is kept as a template:
+# repeats, repetition_period, InlineResultsProcessing, ResultsFormatting
+# and TketOptimizations.
+_CONFIG_TEMPLATE = (
+    '{"$type":"<class \'qat.purr.compiler.config.CompilerConfig\'>",'
+    '"$data":{'
+    '"repeats":%d,'
+    '"repetition_period":%s,'
+    '"results_format":{'
+    '"$type":"<class \'qat.purr.compiler.config.QuantumResultsFormat\'>",'
+    '"$data":{'
+    '"format":{'
+    '"$type":"<enum \'qat.purr.compiler.config.InlineResultsProcessing\'>",'
+    '"$value":%d},'
+    '"transforms":{'
+    '"$type":"<enum \'qat.purr.compiler.config.ResultsFormatting\'>",'
+    '"$value":%d}}},'
+    '"metrics":{'
+    '"$type":"<enum \'qat.purr.compiler.config.MetricsType\'>",'
+    '"$value":6},'
+    '"active_calibrations":[],'
+    '"optimizations":{'
+    '"$type":"<enum \'qat.purr.compiler.config.TketOptimizations\'>",'
+    '"$value":%d}}}'
+)
+
+# optimization level -> TketOptimizations value
+_TKET_OPTIMIZATIONS = {
+    0: 1,
+    1: 18,
+    2: 30,
+}
+
+# res_format -> (InlineResultsProcessing, ResultsFormatting)
+_RESULTS_FORMATS = {
+    "binary_count": (1, 3),
+    "raw": (1, 2),
+    "binary": (2, 2),
+    "squash_binary_result_arrays": (2, 6),
+}
+
 
 def _optimization_options_builder(
     optimization: int, optimization_backend: str = "Tket"
@@ -62,20 +113,14 @@ def _optimization_options_builder(
             If asked for a not valid optimization level
 
     """
-    start = time.time_ns()
     if optimization_backend != "Tket":
         raise TypeError(f"{optimization_backend}: Not a valid type")
-    if optimization == 1:
-        opt_value = 18
-    elif optimization == 2:
-        opt_value = 30
-    elif optimization == 0:
-        opt_value = 1
-    else:
-        raise ValueError(f"{optimization}: Not a valid Optimization Value")
-    end = time.time_ns()
-    logger.info(f"Optimization options built in: {(end - start)/1e9}")
-    return opt_value
+    try:
+        return _TKET_OPTIMIZATIONS[optimization]
+    except KeyError:
+        raise ValueError(
+            f"{optimization}: Not a valid Optimization Value"
+        ) from None
 
 
 def _results_format_builder(
@@ -111,33 +156,13 @@ def _results_format_builder(
     KeyError
         If the provided `res_format` is not a valid result format.
     """
-    match = {
-        "binary_count": {
-            "InlineResultsProcessing": 1,
-            "ResultsFormatting": 3
-        },
-        "raw": {
-            "InlineResultsProcessing": 1,
-            "ResultsFormatting": 2
-        },
-        "binary": {
-            "InlineResultsProcessing": 2,
-            "ResultsFormatting": 2
-        },
-        "squash_binary_result_arrays": {
-            "InlineResultsProcessing": 2,
-            "ResultsFormatting": 6
-        }
-    }
-    if res_format not in match.keys():
-        raise KeyError(f"{res_format}: Not a valid result format")
-
-    return (
-        match[res_format]["InlineResultsProcessing"],
-        match[res_format]["ResultsFormatting"],
-    )
+    try:
+        return _RESULTS_FORMATS[res_format]
+    except KeyError:
+        raise KeyError(f"{res_format}: Not a valid result format") from None
 
 
+@functools.lru_cache(maxsize=128)
 def _config_builder(
     shots: int,
     repetition_period: Optional[float] = None,
@@ -147,6 +172,9 @@ def _config_builder(
     """
     Builds a config json object from options. Non qat-dependent
 
+    Results are cached, as runs usually repeat the same options and only
+    change the circuit.
+
     Args:
         shots: int : Number of shots
         repetition_period: float : Duration of the circuit execution window.
@@ -164,39 +192,13 @@ def _config_builder(
         _results_format_builder(res_format)
     )
     opt_value = _optimization_options_builder(optimization=optimization)
-    start = time.time_ns()
-    config = {
-        "$type": "<class 'qat.purr.compiler.config.CompilerConfig'>",
-        "$data": {
-            "repeats": shots,
-            "repetition_period": repetition_period,
-            "results_format": {
-                "$type": "<class 'qat.purr.compiler.config.QuantumResultsFormat'>",
-                "$data": {
-                    "format": {
-                        "$type": "<enum 'qat.purr.compiler.config.InlineResultsProcessing'>",
-                        "$value": inlineResultsProcessing,
-                    },
-                    "transforms": {
-                        "$type": "<enum 'qat.purr.compiler.config.ResultsFormatting'>",
-                        "$value": resultsFormatting,
-                    },
-                },
-            },
-            "metrics": {
-                "$type": "<enum 'qat.purr.compiler.config.MetricsType'>",
-                "$value": 6,
-            },
-            "active_calibrations": [],
-            "optimizations": {
-                "$type": "<enum 'qat.purr.compiler.config.TketOptimizations'>",
-                "$value": opt_value,
-            },
-        },
-    }
-    config_str = json.dumps(config)
-    end = time.time_ns()
-    logger.info(f"Config built in: {(end - start)/1e9}")
+    config_str = _CONFIG_TEMPLATE % (
+        shots,
+        "null" if repetition_period is None else repr(float(repetition_period)),
+        inlineResultsProcessing,
+        resultsFormatting,
+        opt_value,
+    )
     return config_str
 
 
@@ -213,12 +215,17 @@ class QPUBackend:
             Identifier to select bash script to tunnel connection if needed.
         _endpoint : str, default = address or ZMQ_SERVER
             Endpoint to connect the client to.
+        _endpoint_ip : str, default = None
+            IP of the endpoint, parsed on the first connection verification.
+        _endpoint_port : int, default = None
+            Port of the endpoint, parsed on the first connection verification.
         _slurmclient : Optional[Any], default = None
             If the Tunnel, this _slurmclient is used.
         _job_id : str, default = None
             Job id returned from slurm.
         _verification_cmd : str, default = None
-            Connection verification command.
+            Shell equivalent of the last connection verification, for
+    debugging.
         _tunnel_time_limit: str, Optional
             User provided time limit to stablish the tunnel job
         reservation_name: str, Optional
@@ -229,7 +236,7 @@ class QPUBackend:
     --------------
     _verify_connection()
         Runs a connection verification command before trying to send any
-    message
+    message. A successful verification is trusted for _verify_ttl seconds.
 
     ContextHandlers
     ---------------
@@ -239,6 +246,9 @@ class QPUBackend:
         When in context, disconnect.
 
     """
+    # Seconds a successful verification of the same endpoint is trusted
+    _verify_ttl: float = 5.0
+
     def __init__(
         self,
         address: Optional[str] = None,
@@ -266,10 +276,14 @@ class QPUBackend:
         """
         self._backend = "qpu"
         self._endpoint = address or ZMQ_SERVER
+        self._endpoint_ip: Optional[str] = None
+        self._endpoint_port: Optional[int] = None
         self.client: Optional[ZMQClient] = None
         self._slurmclient: Optional[SlurmClient] = None
         self._job_id = None
         self._verification_cmd: Optional[str] = None
+        self._last_verified_endpoint: Optional[str] = None
+        self._last_verified_at = float("-inf")
         if time_within_time_limit(tunnel_time_limit):
             self._tunnel_time_limit = tunnel_time_limit or None
         self.reservation_name = reservation_name or None
@@ -300,31 +314,67 @@ class QPUBackend:
         """
         # If no enpoint provided, use the class attribute
         self._logger.debug("Verify connection started")
-        start = time.time_ns()
+        start = time.perf_counter_ns()
         if not endpoint:
             endpoint = self._endpoint
-            self._logger.debug(f"Endpoint from QPUBackend: {self._endpoint}")
+            self._logger.debug("Endpoint from QPUBackend: %s", self._endpoint)
+
+        if (
+            endpoint
+            and endpoint == self._last_verified_endpoint
+            and time.monotonic() - self._last_verified_at < self._verify_ttl
+        ):
+            self._logger.debug("Endpoint %s recently verified", endpoint)
+            return
 
-        pattern = r"tcp://(\d+\.\d+\.\d+\.\d+):(\d+)"
         if endpoint:
-            match = re.match(pattern, endpoint)
-            if match:
-                ip = match.group(1)
-                port = match.group(2)
-                self._logger.debug(f"Endpoint IP found: {ip}")
-                self._logger.debug(f"Endpoint PORT found: {port}")
-                self._verification_cmd = f"nc -zv {ip} {port}"
-                self._logger.debug(
-                    f"Running verification cmd: {self._verification_cmd}"
-                )
-                run(self._verification_cmd)
+            if endpoint == self._endpoint and self._endpoint_ip is not None:
+                # Already parsed on a previous verification
+                ip, port = self._endpoint_ip, self._endpoint_port
             else:
-                raise RuntimeError("Not IP:PORT recovered")
-                # self._logger.error("Not IP:PORT recovered")
-                # sys.exit(1)
+                match = _ENDPOINT_RE.match(endpoint)
+                if not match:
+                    raise RuntimeError("Not IP:PORT recovered")
+                ip = match.group(1)
+                port = int(match.group(2))
+                self._logger.debug("Endpoint IP found: %s", ip)
+                self._logger.debug("Endpoint PORT found: %s", port)
+                if endpoint == self._endpoint:
+                    self._endpoint_ip, self._endpoint_port = ip, port
+            # Shell equivalent of the check, kept for debugging
+            self._verification_cmd = f"nc -zv {ip} {port}"
+            self._logger.debug(
+                "Running verification: %s", self._verification_cmd
+            )
+            try:
+                socket.create_connection((ip, port), timeout=1.0).close()
+            except OSError as e:
+                raise ConnectionRefusedError(
+                    f"Could not connect to {ip}:{port}: {e}"
+                ) from e
+            self._last_verified_endpoint = endpoint
+            self._last_verified_at = time.monotonic()
+
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Connection verified in: %s",
+                (time.perf_counter_ns() - start) / 1e9
+            )
+
+    def _is_endpoint_reachable(self) -> bool:
+        """
+        Check the connection with the control server without raising.
 
-        end = time.time_ns()
-        self._logger.info(f"Connection verified in: {(end - start)/1e9}")
+        Returns
+        -------
+        bool
+            True if the connection verification succeeded.
+        """
+        try:
+            self._verify_connection()
+        except ConnectionRefusedError:
+            return False
+        return True
 
     def __enter__(self):
         """
@@ -358,7 +408,7 @@ class QPUBackend:
 
         """
         self._logger.info("Connect started")
-        start = time.time_ns()
+        start = time.perf_counter_ns()
         if not self._endpoint:
             self._logger.debug("You are outside of the frontal node.")
             self._logger.debug("Starting the redirection process.")
@@ -369,27 +419,50 @@ class QPUBackend:
                     if self.reservation_name
                     else SlurmClient())
 
-            self._job_id, self._endpoint = self._slurmclient.submit_and_wait(
-                backend=self._backend,
-                time_limit=self._tunnel_time_limit
+            self._job_id, self._endpoint_ip, self._endpoint_port = (
+                self._slurmclient.submit_and_wait(
+                    backend=self._backend,
+                    time_limit=self._tunnel_time_limit
+                )
             )
+            if self._job_id:
+                self._endpoint = (
+                    f"tcp://{self._endpoint_ip}:{self._endpoint_port}"
+                )
             self._logger.debug(
-                f"Returns of submit and wait: job_id = {self._job_id}& "
-                f"endpoint = {self._endpoint}"
-            )
-            time.sleep(0.3)
-            end_tunnel_job = time.time_ns()
-            self._logger.info(
-                f"Tunnel job stablished in: {(end_tunnel_job - start)/1e9}"
+                "Returns of submit and wait: job_id = %s& endpoint = %s",
+                self._job_id, self._endpoint
             )
+            # The tunnel may take a moment to accept connections
+            wait_until(self._is_endpoint_reachable, timeout=5.0)
+            if self._logger.isEnabledFor(logging.INFO):
+                self._logger.info(
+                    "Tunnel job stablished in: %s",
+                    (time.perf_counter_ns() - start) / 1e9
+                )
 
         # Verify the connection
         self._verify_connection()
 
         if not self.client:
-            self.client = ZMQClient(address=self._endpoint)
-        end = time.time_ns()
-        self._logger.info(f"Connection stablished in: {(end - start)/1e9}")
+            self.client = self._new_client()
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Connection stablished in: %s",
+                (time.perf_counter_ns() - start) / 1e9
+            )
+
+    def _new_client(self) -> ZMQClient:
+        """
+        Create the client used to talk to the server at the endpoint
+
+        Returns:
+        --------
+        ZMQClient
+            Client connected to the current endpoint.
+
+        """
+        return ZMQClient(address=self._endpoint)
 
     def disconnect(self) -> None:
         """
@@ -409,36 +482,59 @@ class QPUBackend:
         --------
         None
 
+        Raises:
+        -------
+        TimeoutError
+            If the tunnel job is still running 30 seconds after the
+        scancel. The client is closed anyway and the job id is kept so
+        the disconnection can be retried.
+
         """
         self._logger.info("Disconnect method started")
-        start = time.time_ns()
+        start = time.perf_counter_ns()
+        job_id = self._job_id
+        cancelled = True
         # Check if job is running before trying to cancel it
-        if self._job_id:
-            while self._slurmclient._is_job_running(self._job_id):
+        if job_id:
+            if self._slurmclient._is_job_running(job_id):
                 try:
-                    self._slurmclient.scancel(self._job_id)
+                    self._slurmclient.scancel(job_id)
                     self._logger.debug(
-                        f"Sending scancel to Tunnel job {self._job_id}."
+                        "Sending scancel to Tunnel job %s.", job_id
                     )
                 except Exception as e:
-                    self._logger.debug(f"Error cancelling the job: {e}")
-                time.sleep(0.5)
+                    self._logger.debug("Error cancelling the job: %s", e)
+                cancelled = wait_until(
+                    lambda: not self._slurmclient._is_job_running(job_id),
+                    timeout=30.0,
+                )
 
-            # Reset _job_id and _endpoint_port if job is cancelled
-            self._job_id = None
-            self._endpoint_port = None
-            self._endpoint = None
+            if cancelled:
+                # Reset _job_id and _endpoint_port if job is cancelled
+                self._job_id = None
+                self._endpoint_ip = None
+                self._endpoint_port = None
+                self._endpoint = None
+                self._last_verified_endpoint = None
 
         # Close the client connection
         if self.client:
             try:
                 self.client.close()
             except Exception as e:
-                self._logger.error(f"Error closing the ZMQClient: {e}")
+                self._logger.error("Error closing the ZMQClient: %s", e)
 
             self.client = None
-        end = time.time_ns()
-        self._logger.info(f"Disconnection happened in: {(end - start)/1e9}")
+
+        if not cancelled:
+            raise TimeoutError(
+                f"Tunnel job {job_id} still running after scancel"
+            )
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Disconnection happened in: %s",
+                (time.perf_counter_ns() - start) / 1e9
+            )
 
     def _state_flush(self) -> None:
         """
@@ -453,14 +549,45 @@ class QPUBackend:
         None
 
         """
-        start_flush = time.time_ns()
+        start = time.perf_counter_ns()
         self._logger.info("Job is no longer running. Flushing variables.")
         self.disconnect()
         self.connect()
-        end_flush = time.time_ns()
-        self._logger.info(
-            f"Flushing completed in: {(end_flush - start_flush)/1e9}"
-        )
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Flushing completed in: %s",
+                (time.perf_counter_ns() - start) / 1e9
+            )
+
+    def _ensure_connection(self) -> None:
+        """
+        Make sure the connection is usable before sending a job
+
+        Parameters:
+        -----------
+        None
+
+        Returns:
+        --------
+        None
+
+        Raises:
+        -------
+        RuntimeError
+            If the backend is not connected to the server.
+
+        """
+        # Check if client is connected before trying to send job
+        if not self.client:
+            raise RuntimeError("Not connected to the server")
+
+        # If there is a job_id but it is not running
+        # reopen the connection. The Tunnel job ended unexpectedly
+        if (
+            self._job_id
+            and not self._slurmclient._is_job_running(self._job_id)
+        ):
+            self._state_flush()
 
     def run(
         self,
@@ -521,19 +648,9 @@ class QPUBackend:
         >>>                           optimization,
         >>>                           res_format)
         """
-        start = time.time_ns()
+        start = time.perf_counter_ns()
         self._logger.info("Run started")
-        # Check if client is connected before trying to send job
-        if not self.client:
-            raise RuntimeError("Not connected to the server")
-
-        # If there is a job_id but it is not running
-        # reopen the connection. The Tunnel job ended unexpectedly
-        if (
-            self._job_id
-            and not self._slurmclient._is_job_running(self._job_id)
-        ):
-            self._state_flush()
+        self._ensure_connection()
 
         # Build config using _config_builder function
         config = _config_builder(
@@ -552,6 +669,210 @@ class QPUBackend:
         # Wait for results from the server
         result = self.client._await_results()
 
-        end = time.time_ns()
-        self._logger.info(f"Job took: {(end - start)/1e9}")
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Job took: %s",
+                (time.perf_counter_ns() - start) / 1e9
+            )
+        return result
+
+    def run_batch(
+        self,
+        circuits: Iterable[str],
+        shots: int,
+        repetition_period: Optional[float] = None,
+        optimization: int = 0,
+        res_format: str = "binary_count",
+    ) -> list:
+        """
+        Run several circuits in the QPU with the same options.
+
+        The connection is checked and the config is built only once for the
+        whole batch. Circuits are then executed one after the other over the
+        same connection, so every circuit in the batch shares the shots,
+        repetition period, optimization and result format.
+
+        Parameters
+        ----------
+        circuits : Iterable[str]
+            The circuits to be executed, in any of the formats accepted by
+        `run`.
+        shots : int
+            The number of times each circuit is executed.
+        repetition_period : Optional[float], default=None
+            The computation time slice, equivalent to CPU clocks.
+        optimization : int, default=0
+            Levels of optimization applied by QAT. It is turned off by default.
+        res_format : str, default="binary_count"
+            Options for how to retrieve results. See `run`.
+
+        Returns
+        -------
+        list
+            The results coming from the quantum hardware, in the same order
+        as the circuits.
+
+        Examples
+        --------
+        >>> from qmio import QmioRuntimeService
+        >>> from qmio.circuits import bell, ghz
+
+        >>> service = QmioRuntimeService()
+        >>> with service.backend(name="qpu") as backend:
+        >>>     results = backend.run_batch([bell(), ghz()], shots=100)
+        """
+        start = time.perf_counter_ns()
+        self._logger.info("Batch run started")
+        self._ensure_connection()
+
+        config = _config_builder(
+            shots,
+            repetition_period=repetition_period,
+            optimization=optimization,
+            res_format=res_format,
+        )
+
+        results = []
+        for circuit in circuits:
+            self.client._send((circuit, config))
+            results.append(self.client._await_results())
+
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Batch of %d jobs took: %s",
+                len(results), (time.perf_counter_ns() - start) / 1e9
+            )
+        return results
+
+
+class AsyncQPUBackend(QPUBackend):
+    """
+    QPUBackend whose runs are coroutines.
+
+    Connection handling is inherited from QPUBackend. Only `run` and
+    `run_batch` are awaited, so circuits sent to several backends can be
+    multiplexed on one event loop with `asyncio.gather`. Runs on the same
+    backend are serialized by its client. The connection check before each
+    run, which may wait on Slurm, happens in a worker thread so it does
+    not stall the other backends.
+
+    Examples
+    --------
+    >>> import asyncio
+    >>> from qmio import QmioRuntimeService
+    >>> from qmio.circuits import bell, ghz
+
+    >>> async def main(backends):
+    >>>     return await asyncio.gather(
+    >>>         *[b.run(c, shots=100) for b, c in zip(backends, [bell(), ghz()])]
+    >>>     )
+
+    >>> service = QmioRuntimeService()
+    >>> with service.async_backend(name="qpu") as b1, \\
+    >>>         service.async_backend(name="qpu") as b2:
+    >>>     results = asyncio.run(main([b1, b2]))
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._connection_lock = threading.Lock()
+
+    def _ensure_connection(self) -> None:
+        """
+        Make sure the connection is usable before sending a job
+
+        Concurrent runs check it one at a time, so a tunnel that ended is
+        only reopened once.
+        """
+        with self._connection_lock:
+            super()._ensure_connection()
+
+    def _new_client(self) -> AsyncZMQClient:
+        """
+        Create the asyncio client used to talk to the server
+
+        Returns:
+        --------
+        AsyncZMQClient
+            Client connected to the current endpoint.
+
+        """
+        return AsyncZMQClient(address=self._endpoint)
+
+    async def run(
+        self,
+        circuit: str,
+        shots: int,
+        repetition_period: Optional[float] = None,
+        optimization: int = 0,
+        res_format: str = "binary_count",
+    ) -> object:
+        """
+        Run a circuit in the QPU, awaiting its results.
+
+        Takes the same parameters as `QPUBackend.run`.
+
+        Returns
+        -------
+        Any
+            The results coming from the quantum hardware.
+        """
+        start = time.perf_counter_ns()
+        self._logger.info("Run started")
+        await asyncio.to_thread(self._ensure_connection)
+
+        config = _config_builder(
+            shots,
+            repetition_period=repetition_period,
+            optimization=optimization,
+            res_format=res_format,
+        )
+        result = await self.client.request((circuit, config))
+
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Job took: %s",
+                (time.perf_counter_ns() - start) / 1e9
+            )
         return result
+
+    async def run_batch(
+        self,
+        circuits: Iterable[str],
+        shots: int,
+        repetition_period: Optional[float] = None,
+        optimization: int = 0,
+        res_format: str = "binary_count",
+    ) -> list:
+        """
+        Run several circuits in the QPU with the same options.
+
+        Takes the same parameters as `QPUBackend.run_batch`. Circuits are
+        executed one after the other over the connection of this backend.
+
+        Returns
+        -------
+        list
+            The results coming from the quantum hardware, in the same order
+        as the circuits.
+        """
+        start = time.perf_counter_ns()
+        self._logger.info("Batch run started")
+        await asyncio.to_thread(self._ensure_connection)
+
+        config = _config_builder(
+            shots,
+            repetition_period=repetition_period,
+            optimization=optimization,
+            res_format=res_format,
+        )
+
+        results = []
+        for circuit in circuits:
+            results.append(await self.client.request((circuit, config)))
+
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Batch of %d jobs took: %s",
+                len(results), (time.perf_counter_ns() - start) / 1e9
+            )
+        return results
@@ -3,6 +3,31 @@ Qmio QASM circuit generators examples
 
 """
 
+_BELL_TEMPLATE = """OPENQASM 3.0;
+include "qelib1.inc";
+qreg q[2];
+creg c[2];
+h q[%(qc)d];
+cx q[%(qc)d],q[%(qt)d];
+measure q[%(qc)d] -> c[0];
+measure q[%(qt)d] -> c[1];"""
+
+_GHZ_TEMPLATE = """OPENQASM 3.0;
+include "qelib1.inc";
+qreg q[3];
+creg meas[3];
+h q[%(qc)d];
+cx q[%(qc)d],q[%(qt1)d];
+cx q[%(qc)d],q[%(qt2)d];
+barrier q[%(qc)d],q[%(qt1)d],q[%(qt2)d];
+measure q[%(qc)d] -> meas[0];
+measure q[%(qt1)d] -> meas[1];
+measure q[%(qt2)d] -> meas[2];"""
+
+# Circuits for the default qubits, generated once
+_BELL_DEFAULT = _BELL_TEMPLATE % {"qc": 0, "qt": 1}
+_GHZ_DEFAULT = _GHZ_TEMPLATE % {"qc": 0, "qt1": 1, "qt2": 2}
+
 
 def bell(qc: int = 0, qt: int = 1) -> str:
     """
@@ -22,15 +47,9 @@ def bell(qc: int = 0, qt: int = 1) -> str:
         QASM 3.0 string with the circuit
 
     """
-    bell = f"""OPENQASM 3.0;
-include "qelib1.inc";
-qreg q[2];
-creg c[2];
-h q[{qc}];
-cx q[{qc}],q[{qt}];
-measure q[{qc}] -> c[0];
-measure q[{qt}] -> c[1];"""
-    return bell
+    if qc == 0 and qt == 1:
+        return _BELL_DEFAULT
+    return _BELL_TEMPLATE % {"qc": qc, "qt": qt}
 
 
 def ghz(qc: int = 0, qt1: int = 1, qt2: int = 2)-> str:
@@ -54,15 +73,6 @@ def ghz(qc: int = 0, qt1: int = 1, qt2: int = 2)-> str:
         QASM 3.0 string with the circuit
 
     """
-    ghz = f"""OPENQASM 3.0;
-include "qelib1.inc";
-qreg q[3];
-creg meas[3];
-h q[{qc}];
-cx q[{qc}],q[{qt1}];
-cx q[{qc}],q[{qt2}];
-barrier q[{qc}],q[{qt1}],q[{qt2}];
-measure q[{qc}] -> meas[0];
-measure q[{qt1}] -> meas[1];
-measure q[{qt2}] -> meas[2];"""
-    return ghz
+    if qc == 0 and qt1 == 1 and qt2 == 2:
+        return _GHZ_DEFAULT
+    return _GHZ_TEMPLATE % {"qc": qc, "qt1": qt1, "qt2": qt2}
@@ -10,6 +10,9 @@ ZMQClient
     Is used by QPUBackend to init a connection with the server
     and exchange mesages.
 
+AsyncZMQClient
+    Asyncio version of ZMQClient, used by AsyncQPUBackend.
+
 SlurmBaseClient
     Abstract class to organize SlurmClient.
 
@@ -19,57 +22,163 @@ SlurmClient
 
 """
 import abc
+import asyncio
+import atexit
+import functools
 import logging
 import os
 import random
 import re
+import socket
+import sys
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 
 # Under testing
-from time import sleep, time, time_ns
+from time import monotonic, perf_counter_ns
 
 import zmq
-from typing import Optional
+import zmq.asyncio
+from typing import ClassVar, Optional
 
 from config import TUNNEL_TIME_LIMIT
-from qmio.utils import RunCommandError, run
+from qmio.utils import RunCommandError, run, wait_until
 
 logger = logging.getLogger(__name__)
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 slurm_scripts_dir = os.path.join(base_dir, 'slurm_scripts/')
+# Backends with a tunnel script, by name
+_BACKEND_SCRIPTS = {
+    name[:-len('.sh')]: os.path.join(slurm_scripts_dir, name)
+    for name in os.listdir(slurm_scripts_dir)
+    if name.endswith('.sh')
+}
+
+_NODES_RE = re.compile(r'Nodes=c(\d+)-(\d+)')
+
+
+@functools.lru_cache(maxsize=16)
+def _partition_node_ip(backend: str, bucket: int) -> str:
+    """
+    Look up the IP of the node of a Slurm partition.
+
+    Parameters
+    ----------
+    backend : str
+        The name of the backend partition.
+    bucket : int
+        Time bucket used as part of the cache key, so results expire.
+
+    Returns
+    -------
+    str
+        The IP address of the backend node.
+
+    Raises
+    ------
+    ValueError
+        If the partition output does not contain a node name.
+    """
+    check_node_cmd = ["scontrol", "show", "partition", backend]
+    stdout, stderr = run(check_node_cmd)
+    logger.debug('stdout: %s\n stderr: %s', stdout, stderr)
+    result = _NODES_RE.search(stdout)
+    if not result:
+        raise ValueError(
+            f'No result came from: "{" ".join(check_node_cmd)}"'
+            'Does not fit a NodeName'
+        )
+    rack, node = result.groups()
+    logger.debug('Rack encountered: %s', rack)
+    logger.debug('Node encountered: %s', node)
+    ip = f'10.120.{rack}.{node}'
+    logger.debug('Ip encountered %s', ip)
+    return ip
+
+
+_context_teardown_registered = False
+# Context classes whose shared instance has been handed out
+_shared_context_classes: set = set()
+
+
+def _destroy_shared_context():
+    """Close any socket left open and terminate the shared ZeroMQ contexts."""
+    for context_class in _shared_context_classes:
+        context_class.instance().destroy(linger=0)
+
+
+def _shared_context(context_class: Optional[type] = None) -> zmq.Context:
+    """
+    Return the process-wide ZeroMQ context of the given class, by default
+    `zmq.Context`.
+
+    The first call registers the teardown at interpreter exit, so every
+    shared context, sync or asyncio, is terminated once, after every
+    client is done with it.
+    """
+    global _context_teardown_registered
+    if not _context_teardown_registered:
+        atexit.register(_destroy_shared_context)
+        _context_teardown_registered = True
+    context_class = context_class or zmq.Context
+    _shared_context_classes.add(context_class)
+    return context_class.instance()
 
 
 class ZMQBase:
     """
     Base class for ZeroMQ communication.
 
-    This class initializes a ZeroMQ context and socket for communication.
+    This class opens a socket on the process-wide ZeroMQ context. The
+    context is shared by every client and only the socket is closed.
 
     Parameters
     ----------
     socket_type : int
         The type of socket to create. This is typically a ZeroMQ socket type
     (e.g., zmq.REQ, zmq.REP).
+    poll_timeout_ms : int, optional
+        Milliseconds each poll waits for incoming messages. Defaults to 2000.
+    context : zmq.Context, optional
+        Context to open the socket on. Defaults to the shared one.
 
     Attributes
     ----------
     _context : zmq.Context
-        The ZeroMQ context for managing sockets.
+        The shared ZeroMQ context for managing sockets.
     _socket : zmq.Socket
         The ZeroMQ socket used for communication.
+    _poller : zmq.Poller
+        Poller registered on the socket for incoming messages.
+    _send_poller : zmq.Poller
+        Poller registered on the socket to wait until it can send.
+    _poll_timeout_ms : int
+        Milliseconds each poll waits for incoming messages.
     _timeout : float
         The timeout period for sending messages, in seconds. Defaults to 30.0.
     _address : str or None
         The address of the socket. Defaults to None.
     _logger : logging.Logger
-        Logger instance for logging messages related to this class.
+        Class logger for messages related to this class.
     """
-    def __init__(self, socket_type):
-        self._context = zmq.Context()
+    _logger: ClassVar[logging.Logger] = logging.getLogger("ZMQBase")
+
+    def __init__(
+            self,
+            socket_type,
+            poll_timeout_ms: int = 2000,
+            context: Optional[zmq.Context] = None,
+    ):
+        self._context = context or _shared_context()
         self._socket = self._context.socket(socket_type)
+        self._poller = zmq.Poller()
+        self._poller.register(self._socket, zmq.POLLIN)
+        self._send_poller = zmq.Poller()
+        self._send_poller.register(self._socket, zmq.POLLOUT)
+        self._poll_timeout_ms = poll_timeout_ms
         self._timeout = 30.0
         self._address = None
-        self._logger = logging.getLogger(self.__class__.__name__)
 
     def _check_recieved(self):
         """
@@ -80,13 +189,14 @@ class ZMQBase:
         Any or None
             The received message if available, None otherwise.
         """
-        start = time_ns()
+        start = perf_counter_ns()
         try:
-            # This NONBLOCK is in qat-rpc class
-            # msg = self._socket.recv_pyobj(zmq.NOBLOCK)
             msg = self._socket.recv_pyobj()
-            end = time_ns()
-            self._logger.info(f"Results received in: {(end - start)/1e9}")
+            if self._logger.isEnabledFor(logging.INFO):
+                self._logger.info(
+                    "Results received in: %s",
+                    (perf_counter_ns() - start) / 1e9
+                )
             return msg
         except zmq.ZMQError:
             return None
@@ -96,7 +206,8 @@ class ZMQBase:
         Send a message through the socket.
 
         This method attempts to send a message and logs the time taken.
-        If sending fails, it retries until a timeout occurs.
+        If sending fails, it waits up to 10 ms for the socket to become
+        writable and retries until a timeout occurs.
 
         Parameters
         ----------
@@ -108,29 +219,34 @@ class ZMQBase:
         TimeoutError
             If sending the message times out.
         """
-        sent = False
-        t0 = time_ns()
-        while not sent:
+        start = perf_counter_ns()
+        deadline = monotonic() + self._timeout
+        while True:
             try:
                 self._socket.send_pyobj(message)
-                sent = True
-                end = time_ns()
-                self._logger.info(f"Message sent in: {(end - t0)/1e9}")
+                break
             except zmq.ZMQError as e:
-                if time() > t0/1e9 + self._timeout:
+                if monotonic() > deadline:
                     raise TimeoutError(
                         f"Sending {message} on {self._address} timedout"
                     )
-                self._logger.error(f"Error sending message: {e}")
+                self._logger.error("Error sending message: %s", e)
+                self._send_poller.poll(timeout=10)
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Message sent in: %s", (perf_counter_ns() - start) / 1e9
+            )
 
     def close(self):
-        """Disconnect the link to the socket."""
+        """Disconnect the link to the socket, keeping the shared context."""
         if self._socket.closed:
             return
-        self._socket.close()
-        self._context.destroy()
+        self._socket.close(linger=0)
 
-    def __del__(self):
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
         self.close()
 
 
@@ -145,25 +261,36 @@ class ZMQClient(ZMQBase):
     ----------
     address : str or None, optional
         The address of the ZeroMQ server to connect to. Defaults to None.
+    poll_timeout_ms : int, optional
+        Milliseconds each poll waits for the results. Defaults to 2000.
+    context : zmq.Context, optional
+        Context to open the socket on. Defaults to the shared one.
 
     Attributes
     ----------
     _address : str or None
         The address of the server that this client will connect to.
     """
-    def __init__(self, address=None):
-        super().__init__(zmq.REQ)
+    _logger: ClassVar[logging.Logger] = logging.getLogger("ZMQClient")
+
+    def __init__(
+            self,
+            address=None,
+            poll_timeout_ms: int = 2000,
+            context: Optional[zmq.Context] = None,
+    ):
+        super().__init__(zmq.REQ, poll_timeout_ms=poll_timeout_ms, context=context)
         self._socket.setsockopt(zmq.LINGER, 0)
         self._address = address
-        self._logger = logging.getLogger(self.__class__.__name__)
-        self._logger.debug(f"Address for ZMQClient: {self._address}")
+        self._logger.debug("Address for ZMQClient: %s", self._address)
         self._socket.connect(self._address)
 
     def _await_results(self):
         """
         Await results from the server.
 
-        This method checks for results until they are received.
+        This method polls the socket, sleeping until a message is
+        available, and only then reads it.
 
         Returns
         -------
@@ -175,15 +302,146 @@ class ZMQClient(ZMQBase):
         RuntimeError
             If the connection fails or results cannot be received.
         """
-        start = time_ns()
+        start = perf_counter_ns()
         result = None
         while result is None:
-            result = self._check_recieved()
-        end = time_ns()
-        self._logger.info(f"Results awaited for: {(end - start)/1e9}")
+            socks = dict(self._poller.poll(timeout=self._poll_timeout_ms))
+            if self._socket in socks:
+                result = self._check_recieved()
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Results awaited for: %s", (perf_counter_ns() - start) / 1e9
+            )
         return result
 
 
+class AsyncZMQClient(ZMQBase):
+    """
+    Asyncio client used to communicate with a ZeroMQ server.
+
+    Works like `ZMQClient`, but sending and awaiting results are
+    coroutines, so many clients can wait for their servers on a single
+    event loop. The socket belongs to the shared `zmq.asyncio` context.
+
+    Parameters
+    ----------
+    address : str or None, optional
+        The address of the ZeroMQ server to connect to. Defaults to None.
+
+    Attributes
+    ----------
+    _address : str or None
+        The address of the server that this client will connect to.
+    _lock : asyncio.Lock or None
+        Serializes requests, as the REQ socket allows only one in flight.
+    _lock_loop : asyncio.AbstractEventLoop or None
+        Event loop `_lock` was created for.
+    """
+    _logger: ClassVar[logging.Logger] = logging.getLogger("AsyncZMQClient")
+
+    def __init__(self, address=None):
+        super().__init__(zmq.REQ, context=_shared_context(zmq.asyncio.Context))
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._address = address
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._logger.debug("Address for AsyncZMQClient: %s", self._address)
+        self._socket.connect(self._address)
+
+    def _reset_socket(self) -> None:
+        """
+        Replace the socket with a fresh one connected to the same address.
+
+        A REQ socket that sent a request but never read the reply refuses
+        any further send, so it is discarded along with the pending reply.
+        """
+        self._poller.unregister(self._socket)
+        self._send_poller.unregister(self._socket)
+        self._socket.close(linger=0)
+        self._socket = self._context.socket(zmq.REQ)
+        self._socket.setsockopt(zmq.LINGER, 0)
+        self._poller.register(self._socket, zmq.POLLIN)
+        self._send_poller.register(self._socket, zmq.POLLOUT)
+        self._socket.connect(self._address)
+
+    async def _send(self, message) -> None:
+        """
+        Send a message through the socket.
+
+        Parameters
+        ----------
+        message : Any
+            The message to be sent through the socket.
+
+        Raises
+        ------
+        TimeoutError
+            If sending the message times out.
+        """
+        start = perf_counter_ns()
+        try:
+            await asyncio.wait_for(
+                self._socket.send_pyobj(message), self._timeout
+            )
+        except asyncio.TimeoutError:
+            raise TimeoutError(
+                f"Sending {message} on {self._address} timedout"
+            ) from None
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Message sent in: %s", (perf_counter_ns() - start) / 1e9
+            )
+
+    async def _await_results(self):
+        """
+        Await results from the server.
+
+        Returns
+        -------
+        Any
+            The result received from the server.
+        """
+        start = perf_counter_ns()
+        result = await self._socket.recv_pyobj()
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Results awaited for: %s", (perf_counter_ns() - start) / 1e9
+            )
+        return result
+
+    async def request(self, message):
+        """
+        Send a message and await its reply.
+
+        Concurrent requests on the same client wait for their turn. If the
+        request is cancelled or fails midway, the socket is replaced so
+        later requests can still be sent.
+
+        Parameters
+        ----------
+        message : Any
+            The message to be sent through the socket.
+
+        Returns
+        -------
+        Any
+            The result received from the server.
+        """
+        # Created here, once per loop: an asyncio.Lock is bound to the
+        # loop it is first used on
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        async with self._lock:
+            try:
+                await self._send(message)
+                return await self._await_results()
+            except BaseException:
+                self._reset_socket()
+                raise
+
+
 class SlurmBaseClient(abc.ABC):
     """
     Slurm Base Client Abstract Class
@@ -209,7 +467,7 @@ class SlurmBaseClient(abc.ABC):
             endpoint_port=None,
             backend=None,
             time_limit: Optional[str] = None
-    ) -> tuple[Optional[str], Optional[str]]:  # pragma: no cover
+    ) -> tuple[Optional[str], Optional[str], Optional[int]]:  # pragma: no cover
         pass
 
 
@@ -226,18 +484,24 @@ class SlurmClient(SlurmBaseClient):
         Job ID assigned by Slurm for tracking the submitted job.
     _endpoint_port : int
         Port used to redirect connections.
-    _scancel_cmd : str
+    _scancel_cmd : list[str]
         Command to cancel a job in Slurm.
-    _check_cmd : str
+    _check_cmd : list[str]
         Command to check if a job is currently running.
-    _submit_cmd : str
+    _submit_cmd : list[str]
         Command to allocate and submit a job to Slurm.
-    _max_retries : int
-        Number to stablish a time limit to wait for resources in tunneled jobs
+    _max_wait : float
+        Seconds to wait for resources in tunneled jobs.
     _tunnel_time_limit : optional, str
         Time limit tu use for interactive tunnel jobs
     reservation_name : optrional, str
         Slurm reservation name provided to aim tunnel jobs towards
+    _sbatch_prefix : list[str]
+        Leading sbatch arguments, rebuilt when the reservation changes.
+
+    The states of the jobs being watched are shared by every instance, so
+    clients polling at the same time refresh them with a single squeue call.
+    `_poll_lock` guards them, as clients may poll from several threads.
 
     Methods
     -------
@@ -246,20 +510,43 @@ class SlurmClient(SlurmBaseClient):
     submit(endpoint_port):
         Submits a tunnel job to redirect connections to the specified endpoint
     port.
+    submit_and_wait_many(backends):
+        Submits tunnel jobs to several backends at once.
     _is_job_running(job_id):
         Checks if the job with the specified job ID is currently running.
     """
+    _logger: ClassVar[logging.Logger] = logging.getLogger("SlurmClient")
+    _watched_jobs: set = set()
+    _job_states: dict = {}
+    _last_poll: float = float("-inf")
+    _poll_cache_seconds: float = 1.0
+    _poll_lock: ClassVar[threading.Lock] = threading.Lock()
+    # Ports the tunnel scripts are allowed to redirect
+    _port_range: tuple[int, int] = (600, 700)
+    _port_tries: int = 10
+    _rng = random.SystemRandom()
+
     def __init__(
             self,
             time_limit: Optional[str] = None,
             reservation_name: Optional[str] = None,
     ):
         super().__init__()
-        self._logger = logging.getLogger(self.__class__.__name__)
-        self._max_retries: int = 288000
+        self._max_wait: float = 8 * 60 * 60
         self._tunnel_time_limit: Optional[str] = TUNNEL_TIME_LIMIT or None
         self.reservation_name = reservation_name or None
 
+    @property
+    def reservation_name(self) -> Optional[str]:
+        return self._reservation_name
+
+    @reservation_name.setter
+    def reservation_name(self, reservation_name: Optional[str]) -> None:
+        self._reservation_name = reservation_name
+        self._sbatch_prefix = ["sbatch", "--parsable"]
+        if reservation_name:
+            self._sbatch_prefix.append(f"--reservation={reservation_name}")
+
     def scancel(self, job_id: Optional[str] = None):
         """
         Cancel a job to deallocate the frontal node.
@@ -274,22 +561,26 @@ class SlurmClient(SlurmBaseClient):
         -------
         None
         """
-        start = time_ns()
+        start = perf_counter_ns()
         if job_id is None:
             job_id = self._job_id
-        self._scancel_cmd = f"scancel {job_id}"
+        self._scancel_cmd = ["scancel", str(job_id)]
         run(self._scancel_cmd)
-        end = time_ns()
-        self._logger.info(
-            f"Slurm cancelation happended in: {(end - start)/1e9}"
-        )
+        # Forces the next check to ask Slurm for the new state
+        with SlurmClient._poll_lock:
+            SlurmClient._job_states.pop(str(job_id), None)
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Slurm cancelation happended in: %s",
+                (perf_counter_ns() - start) / 1e9
+            )
 
     def _is_job_running(self, job_id=None) -> bool:
         """
         Check if the specified job is currently running.
 
-        Executes the Slurm command to check job status and looks for
-        the 'RUNNING' string in the output.
+        Uses the shared job states, refreshing them with squeue when they
+        are older than `_poll_cache_seconds` or the job is not known yet.
 
         Parameters
         ----------
@@ -301,23 +592,55 @@ class SlurmClient(SlurmBaseClient):
         bool
             True if the job is running, False otherwise.
         """
-        start = time_ns()
+        start = perf_counter_ns()
         if job_id is None:
             job_id = self._job_id
-        self._check_cmd = f"scontrol show job {job_id}"
-        stdout, stderr = run(self._check_cmd)
+        job_id = str(job_id)
+        # Threads checking at the same time wait for a single refresh
+        with SlurmClient._poll_lock:
+            SlurmClient._watched_jobs.add(job_id)
+            if (
+                    job_id not in SlurmClient._job_states
+                    or monotonic() - SlurmClient._last_poll
+                    >= self._poll_cache_seconds
+            ):
+                self._poll_job_states()
+            running = SlurmClient._job_states.get(job_id) == "RUNNING"
+
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "Job checked running in: %s", (perf_counter_ns() - start) / 1e9
+            )
+        return running
+
+    def _poll_job_states(self) -> None:
+        """
+        Refresh the state of every watched job with one squeue call.
 
-        end = time_ns()
-        self._logger.info(f"Job checked running in: {(end - start)/1e9}")
-        if "RUNNING" in stdout:
-            return True
-        else:
-            return False
+        Queried jobs missing from the output have left the queue and stop
+        being watched. Must be called holding `_poll_lock`.
+        """
+        queried = sorted(SlurmClient._watched_jobs)
+        self._check_cmd = ["squeue", "-h", "-j", ",".join(queried), "-o", "%i %T"]
+        stdout, stderr = run(self._check_cmd)
+        states = {}
+        for line in stdout.splitlines():
+            fields = line.split()
+            if len(fields) == 2:
+                states[fields[0]] = fields[1]
+        for job_id in queried:
+            if job_id not in states:
+                SlurmClient._watched_jobs.discard(job_id)
+                SlurmClient._job_states.pop(job_id, None)
+        SlurmClient._job_states.update(states)
+        SlurmClient._last_poll = monotonic()
 
     def _check_backend_node(self, backend: str = "") -> str:
         """
         Retrieve the IP of the specified backend partition node from Slurm.
 
+        The result is cached for up to a minute.
+
         Parameters
         ----------
         backend : str
@@ -330,39 +653,78 @@ class SlurmClient(SlurmBaseClient):
 
         Raises
         ------
+        ValueError
+            If no backend is specified or the partition has no node name.
         RunCommandError
-            If no backend is specified or if the command fails to retrieve the
-        node IP.
+            If the command fails to retrieve the node IP.
         """
-        start = time_ns()
+        start = perf_counter_ns()
         if not backend:
-            raise RunCommandError('No backend spedified')
-        _check_node_cmd = f'scontrol show partition {backend}'
-        stdout, stderr = run(_check_node_cmd)
-        self._logger.debug(f'stdout: {stdout}\n stderr: {stderr}')
-        result = re.search(r'Nodes=c(\d+)-(\d+)', stdout)
-
-        if result:
-            rack = result.group(1)
-            self._logger.debug(f'Rack encountered: {rack}')
-            node = result.group(2)
-            self._logger.debug(f'Node encountered: {node}')
-            ip = f'10.120.{rack}.{node}'
-            self._logger.debug(f'Ip encountered {ip}')
-            end = time_ns()
-            self._logger.info(f"backend node checked in: {(end - start)/1e9}")
-            return ip
-        else:
-            raise ValueError(
-                f'No result came from: "{_check_node_cmd}"'
-                'Does not fit a NodeName'
+            raise ValueError('No backend specified')
+        # Partitions are only reconfigured by admins, one lookup per minute
+        # is shared by every submission
+        ip = _partition_node_ip(backend, int(monotonic() // 60))
+        if self._logger.isEnabledFor(logging.INFO):
+            self._logger.info(
+                "backend node checked in: %s",
+                (perf_counter_ns() - start) / 1e9
             )
+        return ip
+
+    @staticmethod
+    def _port_in_use(ip: str, port: int) -> bool:
+        """
+        Check if something is already listening on a port of the node.
+
+        Parameters
+        ----------
+        ip : str
+            The IP address of the backend node.
+        port : int
+            The port to probe.
+
+        Returns
+        -------
+        bool
+            True if the connection was accepted, False otherwise.
+        """
+        with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as sock:
+            sock.settimeout(0.5)
+            return sock.connect_ex((ip, port)) == 0
+
+    def _pick_port(self, ip: str) -> int:
+        """
+        Pick a tunnel port that is not already in use on the backend node.
+
+        Parameters
+        ----------
+        ip : str
+            The IP address of the backend node.
+
+        Returns
+        -------
+        int
+            A port within `_port_range` that refused the probe.
+
+        Raises
+        ------
+        RuntimeError
+            If no free port is found after `_port_tries` attempts.
+        """
+        low, high = self._port_range
+        for _ in range(self._port_tries):
+            port = self._rng.randrange(low, high)
+            if not self._port_in_use(ip, port):
+                return port
+            self._logger.debug("Port %s already in use on %s", port, ip)
+        raise RuntimeError(f"No free tunnel port found on {ip}")
 
     def submit_and_wait(
             self,
             endpoint_port=None,
             backend=None,
-            time_limit: Optional[str] = None
+            time_limit: Optional[str] = None,
+            stop: Optional[threading.Event] = None,
     ):
         """
         Submit the tunnel job to Slurm and wait for it to start.
@@ -374,107 +736,229 @@ class SlurmClient(SlurmBaseClient):
         ----------
         endpoint_port : int, optional
             The port for redirecting connections. If None, a random port
-        between 600 and 699 is used.
+        between 600 and 699 that is free on the backend node is used.
         backend : str, optional
             The name of the backend partition where the job is submitted.
         time_limit : str, optional
             The time limit for the tunner job. If not explicitly set will use
         the class default -> module default.
+        stop : threading.Event, optional
+            When set from another thread, the job is cancelled instead of
+        waited for.
 
         Returns
         -------
         tuple
-            Contains the job ID and the endpoint string.
+            Contains the job ID, the IP of the backend node and the endpoint
+        port. All of them are None if the submission was interrupted or
+        stopped.
 
         Raises
         ------
         ValueError
-            If the backend is not specified.
+            If the backend is not specified or has no tunnel script.
         TimeoutError
             If the job does not start within the allowed timeframe.
+
+        Any error raised once the job is submitted cancels it before being
+        propagated.
         """
-        start = time_ns()
+        start = perf_counter_ns()
         if backend is None:
             raise ValueError("Backend not specified")
+        script = _BACKEND_SCRIPTS.get(backend)
+        if script is None:
+            raise ValueError(f"No tunnel script for backend: {backend}")
+        submitted_job = None
         try:
-            if endpoint_port is None:
-                self._endpoint_port = random.randint(600, 699)
-                end_endpoint_get = time_ns()
-                self._logger.info(
-                    f"Endpoint port got in: {(end_endpoint_get - start)/1e9}"
-                )
-
-            if not self.reservation_name:
-                self._submit_cmd = (
-                    f"sbatch --time={time_limit or self._tunnel_time_limit}"
-                    f" {slurm_scripts_dir}{backend}.sh {self._endpoint_port}"
-                )
+            node_ip = self._check_backend_node(backend)
+            if endpoint_port is not None:
+                self._endpoint_port = endpoint_port
             else:
-                self._submit_cmd = (
-                    f"sbatch --reservation='{self.reservation_name}' "
-                    f"--time={time_limit or self._tunnel_time_limit} "
-                    f"{slurm_scripts_dir}{backend}.sh {self._endpoint_port}"
-                )
+                self._endpoint_port = self._pick_port(node_ip)
+                if self._logger.isEnabledFor(logging.INFO):
+                    self._logger.info(
+                        "Endpoint port got in: %s",
+                        (perf_counter_ns() - start) / 1e9
+                    )
+
+            if stop is not None and stop.is_set():
+                return None, None, None
+
+            self._submit_cmd = [
+                *self._sbatch_prefix,
+                f"--time={time_limit or self._tunnel_time_limit}",
+                script,
+                str(self._endpoint_port),
+            ]
 
             stdout, stderr = run(self._submit_cmd)
 
-            self._logger.debug(f"Submission command: {self._submit_cmd}")
-            self._logger.debug(f"Command output: {stdout}")
-            self._logger.debug(f"Command error: {stderr}")
+            self._logger.debug("Submission command: %s", self._submit_cmd)
+            self._logger.debug("Command output: %s", stdout)
+            self._logger.debug("Command error: %s", stderr)
 
-            match = re.search(r"Submitted batch job (\d+)", stdout)
-            if not match:
+            # --parsable prints "<job_id>" or "<job_id>;<cluster>"
+            job_id = stdout.strip().split(";")[0]
+            if not job_id.isdigit():
                 raise RunCommandError(
                     f"Failed to find job ID in command output: {stdout}"
                 )
 
-            self._job_id = match.group(1)
+            self._job_id = submitted_job = job_id
 
-            self._logger.info(
-                f"Submitting Tunnel job to slurm: {self._job_id}"
-            )
-            end_submission = time_ns()
-            self._logger.info(
-                f"Tunnel Job submitted in: {(end_submission - start)/1e9}"
-            )
+            self._logger.info("Submitting Tunnel job to slurm: %s", self._job_id)
+            if self._logger.isEnabledFor(logging.INFO):
+                self._logger.info(
+                    "Tunnel Job submitted in: %s",
+                    (perf_counter_ns() - start) / 1e9
+                )
 
-            count = 0
-            # Max number of retries to not allow anf infinite loop
-            # (8hours*60*60)*0,1timeslice = 288000
-            while (
-                    not self._is_job_running(self._job_id)
-                    and count < self._max_retries
+            next_print = monotonic()
+
+            def job_started():
+                nonlocal next_print
+                if self._is_job_running(self._job_id):
+                    return True
+                now = monotonic()
+                if now >= next_print:
+                    sys.stderr.write("Waiting for resources\r")
+                    sys.stderr.flush()
+                    next_print = now + 3
+                return False
+
+            # A just submitted job is still pending, so the first check
+            # waits 1s. Then it backs off up to 10s between checks, waking
+            # up right away if asked to stop.
+            if not wait_until(
+                    job_started,
+                    timeout=self._max_wait,
+                    initial_delay=1.0,
+                    max_delay=10.0,
+                    initial_check=False,
+                    stop=stop,
             ):
-                sleep(0.1)
-                if count % 30 == 0:
-                    print("Waiting for resources\r", end="")
-                count += 1
-                if count >= self._max_retries:
-                    raise TimeoutError(
-                        "Tunnel did not start withing the 8h time frame"
-                    )
+                if stop is not None and stop.is_set():
+                    self.scancel(self._job_id)
+                    self._logger.info("Job %s cancelled on stop", self._job_id)
+                    self._job_id = None
+                    return None, None, None
+                raise TimeoutError(
+                    "Tunnel did not start withing the 8h time frame"
+                )
 
             self._logger.info("The job started")
-            print("\r")
-            print("Job started\r", end="")
-
-            # endpoint ip hardcoded
-            # endpoint = f"tcp://10.120.7.23:{self._endpoint_port}"
-            node_ip = self._check_backend_node(backend)
-            endpoint = f'tcp://{node_ip}:{self._endpoint_port}'
+            sys.stderr.write("\r\nJob started\r")
+            sys.stderr.flush()
 
-            self._logger.debug(f"Endpoint port value {self._endpoint_port}")
+            self._logger.debug("Endpoint port value %s", self._endpoint_port)
 
-            end_submit_and_wait = time_ns()
-            self._logger.info(
-                f"Tunnel Job running in: {(end_submit_and_wait - start)/1e9}"
-            )
-            return self._job_id, endpoint
+            if self._logger.isEnabledFor(logging.INFO):
+                self._logger.info(
+                    "Tunnel Job running in: %s",
+                    (perf_counter_ns() - start) / 1e9
+                )
+            return self._job_id, node_ip, self._endpoint_port
         except KeyboardInterrupt:
             self.scancel(self._job_id)
             self._logger.info(
-                f"Job {self._job_id} cancelled by Keyboard Interruption"
+                "Job %s cancelled by Keyboard Interruption", self._job_id
             )
-            self._job_id = endpoint = None
+            self._job_id = None
             # sys.exit(1)
-            return self._job_id, endpoint
+            return None, None, None
+        except BaseException:
+            # A job left queued would open a tunnel nobody uses
+            if submitted_job is not None:
+                self.scancel(submitted_job)
+                self._job_id = None
+            raise
+
+    def submit_and_wait_many(
+            self,
+            backends,
+            time_limit: Optional[str] = None,
+            max_workers: int = 16,
+    ) -> list:
+        """
+        Submit tunnel jobs to several backends and wait for all of them.
+
+        Each backend is handled by its own SlurmClient, with the same
+        reservation and time limit, in a thread pool. Most of the time is
+        spent waiting on Slurm commands, so the submissions overlap.
+
+        As soon as one submission fails, or on a keyboard interruption, the
+        remaining submissions are stopped and every tunnel job already
+        submitted is cancelled.
+
+        Parameters
+        ----------
+        backends : Iterable[str]
+            The names of the backend partitions.
+        time_limit : str, optional
+            The time limit for the tunnel jobs. If not explicitly set will use
+        the class default -> module default.
+        max_workers : int, optional
+            Maximum number of submissions running at the same time.
+
+        Returns
+        -------
+        list
+            (backend, (job_id, node_ip, endpoint_port)) pairs, in the same
+        order as the backends.
+
+        Raises
+        ------
+        Exception
+            The first error raised by a submission, after cancelling the
+        tunnel jobs.
+        KeyboardInterrupt
+            If interrupted while waiting, after cancelling the tunnel jobs.
+        """
+        backends = list(backends)
+        if not backends:
+            return []
+
+        # Worker threads never see a KeyboardInterrupt, so they are told
+        # to stop and cancel their own jobs through this event
+        stop = threading.Event()
+
+        def submit(backend):
+            client = type(self)(reservation_name=self.reservation_name)
+            return client.submit_and_wait(
+                backend=backend,
+                time_limit=time_limit or self._tunnel_time_limit,
+                stop=stop,
+            )
+
+        def cancel_all():
+            stop.set()
+            # Waits for the running submissions to wind down, queued ones
+            # never start
+            pool.shutdown(wait=True, cancel_futures=True)
+            for future in futures:
+                if future.cancelled() or future.exception() is not None:
+                    continue
+                job_id = future.result()[0]
+                if job_id:
+                    self.scancel(job_id)
+
+        pool = ThreadPoolExecutor(max_workers=min(max_workers, len(backends)))
+        futures = [pool.submit(submit, backend) for backend in backends]
+        try:
+            done, _ = wait(futures, return_when=FIRST_EXCEPTION)
+        except KeyboardInterrupt:
+            self._logger.info("Tunnel jobs cancelled by Keyboard Interruption")
+            cancel_all()
+            raise
+
+        for future in futures:
+            if future in done and future.exception() is not None:
+                cancel_all()
+                raise future.exception()
+
+        pool.shutdown()
+        return [
+            (backend, future.result())
+            for backend, future in zip(backends, futures)
+        ]
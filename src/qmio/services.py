@@ -5,12 +5,20 @@ This module provides a class for instantiating QMIO services
 and managing backend connections.
 """
 
-from qmio.backends import QPUBackend
+from qmio.backends import AsyncQPUBackend, QPUBackend
 import logging
-import time
 
 logger = logging.getLogger(__name__)
 
+_BACKENDS: dict[str, type] = {
+    "qpu": QPUBackend,
+    # "qulacs": ...,
+}
+
+_ASYNC_BACKENDS: dict[str, type] = {
+    "qpu": AsyncQPUBackend,
+}
+
 
 class QmioRuntimeService:
     """Class to instance QMIO services.
@@ -26,6 +34,8 @@ class QmioRuntimeService:
     -------
     backend(name):
         Requests a backend service by name.
+    async_backend(name):
+        Requests a backend service whose runs are awaited.
     """
     def __init__(self):
         """Initialize the QmioRuntimeService instance.
@@ -57,12 +67,34 @@ class QmioRuntimeService:
         ValueError
             If the requested backend name is unknown.
         """
-        start = time.time_ns()
-        if name == "qpu":
-            return QPUBackend()
-        # if name == "qulacs":
-        #     pass
-
-        end = time.time_ns()
-        logger.info(f"backend recovery time: {(end - start)/1e9}")
-        raise ValueError(f"Backend unknown: {name}")
+        try:
+            backend_cls = _BACKENDS[name]
+        except KeyError:
+            raise ValueError(f"Backend unknown: {name}") from None
+        return backend_cls()
+
+    def async_backend(self, name):
+        """Method to request a backend service with asyncio runs.
+
+        Parameters
+        ----------
+        name : str
+            The name of the backend service to be requested.
+            Supported value: "qpu".
+
+        Returns
+        -------
+        AsyncQPUBackend
+            An instance of the AsyncQPUBackend class if the requested
+            backend is "qpu".
+
+        Raises
+        ------
+        ValueError
+            If the requested backend name is unknown.
+        """
+        try:
+            backend_cls = _ASYNC_BACKENDS[name]
+        except KeyError:
+            raise ValueError(f"Backend unknown: {name}") from None
+        return backend_cls()
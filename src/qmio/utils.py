@@ -5,10 +5,15 @@ This module provides centralized utility functions and classes
 to support various operations within the application,
 including logging setup and command execution.
 """
+import functools
 import logging
 import os
-import subprocess
 import re
+import shlex
+import subprocess
+import threading
+from time import monotonic, sleep
+from typing import Callable, Optional, Sequence, Union
 
 from config import MAX_TUNNEL_TIME_LIMIT
 
@@ -21,6 +26,8 @@ _LOG_LEVELS = {
     'CRITICAL': logging.CRITICAL
 }
 
+_HHMMSS_RE = re.compile(r'^(\d{2}):(\d{2}):(\d{2})$')
+
 
 def _setup_logging():
     """Private logger setup function.
@@ -57,16 +64,17 @@ class RunCommandError(Exception):
     pass
 
 
-def run(cmd: "str") -> tuple[str, str]:
-    """Execute a shell command.
+def run(cmd: Union[str, Sequence[str]]) -> tuple[str, str]:
+    """Execute a command.
 
-    This function runs the specified command in the shell and
-    returns its standard output and standard error.
+    This function runs the specified command without going through a
+    shell and returns its standard output and standard error.
 
     Parameters
     ----------
-    cmd : str
-        The command to be executed in the shell.
+    cmd : str or Sequence[str]
+        The command to be executed. It can be given as an argument list
+        or as a string, which is split following shell-like syntax.
 
     Returns
     -------
@@ -77,18 +85,84 @@ def run(cmd: "str") -> tuple[str, str]:
     Raises
     ------
     RunCommandError
-        If the command returns a non-zero exit status, indicating
-        that an error occurred during execution.
+        If the command can not be started or returns a non-zero exit
+        status, indicating that an error occurred during execution.
     """
-    p = subprocess.run(cmd, shell=True, capture_output=True, check=False)
+    argv = shlex.split(cmd) if isinstance(cmd, str) else list(cmd)
+    try:
+        p = subprocess.run(argv, capture_output=True, text=True, check=False)
+    except OSError as e:
+        raise RunCommandError(str(e)) from e
     if p.returncode != 0:
         raise RunCommandError(p.stderr)
-    return p.stdout.decode('utf8'), p.stderr.decode('utf8')
+    return p.stdout, p.stderr
+
+
+def wait_until(
+        predicate: Callable[[], bool],
+        timeout: float = 30.0,
+        initial_delay: float = 0.05,
+        max_delay: float = 1.0,
+        initial_check: bool = True,
+        stop: Optional[threading.Event] = None,
+) -> bool:
+    """Wait for a condition using exponential backoff.
+
+    The predicate is evaluated right away and then after delays that
+    start at `initial_delay` and double up to `max_delay`, until it
+    returns True or the timeout expires.
+
+    Parameters
+    ----------
+    predicate : Callable[[], bool]
+        Condition to wait for.
+    timeout : float
+        Maximum number of seconds to wait.
+    initial_delay : float
+        Seconds to wait after the first failed check.
+    max_delay : float
+        Upper bound for the delay between checks.
+    initial_check : bool
+        If False, the first check is done after `initial_delay` instead of
+        right away.
+    stop : threading.Event, optional
+        If given, the delays wait on it instead of sleeping, and the wait
+        gives up as soon as it is set.
 
+    Returns
+    -------
+    : bool
+        True if the condition was met, False if the timeout expired or
+        `stop` was set.
+    """
+    def pause(seconds):
+        if stop is None:
+            sleep(seconds)
+            return False
+        return stop.wait(seconds)
+
+    deadline = monotonic() + timeout
+    delay = initial_delay
+    if not initial_check:
+        if pause(min(delay, timeout)):
+            return False
+        delay = min(delay * 2, max_delay)
+    while not predicate():
+        remaining = deadline - monotonic()
+        if remaining <= 0:
+            return False
+        if pause(min(delay, remaining)):
+            return False
+        delay = min(delay * 2, max_delay)
+    return True
 
+
+@functools.lru_cache(maxsize=128)
 def time_to_seconds(time_limit_str: str) -> int:
     """Change a time format HH:MM:SS to seconds
 
+    Results are cached, as the same limits are validated repeatedly.
+
     Parameters
     ----------
     time_limit_str : str
@@ -107,15 +181,14 @@ def time_to_seconds(time_limit_str: str) -> int:
     ValueError
         If there is a value out of range in the format specified
     """
-    if not re.match(
-            r'^\d{2}:\d{2}:\d{2}$', time_limit_str
-    ):
+    match = _HHMMSS_RE.match(time_limit_str)
+    if not match:
         raise ValueError(
             f"Time format specified not valid '{time_limit_str}'."
             " Must be HH:MM:SS."
         )
 
-    hours, minutes, seconds = map(int, time_limit_str.split(":"))
+    hours, minutes, seconds = (int(group) for group in match.groups())
 
     if not (0 <= hours <= 23 and 0 <= minutes <= 59 and 0 <= seconds <= 59):
         raise ValueError(
@@ -124,6 +197,9 @@ def time_to_seconds(time_limit_str: str) -> int:
     return hours * 3600 + minutes * 60 + seconds
 
 
+_MAX_TUNNEL_SECONDS = time_to_seconds(MAX_TUNNEL_TIME_LIMIT)
+
+
 def time_within_time_limit(
         time_limit,
         max_time_limit: str = MAX_TUNNEL_TIME_LIMIT
@@ -152,7 +228,10 @@ def time_within_time_limit(
     if not time_limit:
         return True
     current_seconds = time_to_seconds(time_limit)
-    max_seconds = time_to_seconds(max_time_limit)
+    if max_time_limit == MAX_TUNNEL_TIME_LIMIT:
+        max_seconds = _MAX_TUNNEL_SECONDS
+    else:
+        max_seconds = time_to_seconds(max_time_limit)
 
     if current_seconds > max_seconds:
         raise ValueError(
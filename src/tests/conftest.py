@@ -0,0 +1,25 @@
+import subprocess
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    # Las esperas de wait_until no aportan nada a los tests: se anulan sin
+    # tocar time.sleep, que otros tests usan de verdad
+    monkeypatch.setattr("qmio.utils.sleep", lambda *_: None)
+
+
+@pytest.fixture
+def subprocess_run_mock():
+    with patch("qmio.utils.subprocess.run") as mock_run:
+        yield mock_run
+
+
+@pytest.fixture
+def completed_process_factory():
+    # Un CompletedProcess real en lugar de un MagicMock con la misma forma
+    def factory(returncode=0, stdout="", stderr=""):
+        return subprocess.CompletedProcess([], returncode, stdout=stdout, stderr=stderr)
+    return factory
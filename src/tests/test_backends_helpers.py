@@ -1,11 +1,33 @@
 ### Tests de las funciones del backend qpu ###
 from qmio.backends import _config_builder, _optimization_options_builder, _results_format_builder
+import json
+
 import pytest
 
 
 def test_config_builder():
     result_config = _config_builder(shots=100, repetition_period=500*10**-6, optimization=0, res_format="binary_count")
-    assert result_config == '{"$type": "<class \'qat.purr.compiler.config.CompilerConfig\'>", "$data": {"repeats": 100, "repetition_period": 0.0005, "results_format": {"$type": "<class \'qat.purr.compiler.config.QuantumResultsFormat\'>", "$data": {"format": {"$type": "<enum \'qat.purr.compiler.config.InlineResultsProcessing\'>", "$value": 1}, "transforms": {"$type": "<enum \'qat.purr.compiler.config.ResultsFormatting\'>", "$value": 3}}}, "metrics": {"$type": "<enum \'qat.purr.compiler.config.MetricsType\'>", "$value": 6}, "active_calibrations": [], "optimizations": {"$type": "<enum \'qat.purr.compiler.config.TketOptimizations\'>", "$value": 1}}}'
+    assert result_config == '{"$type":"<class \'qat.purr.compiler.config.CompilerConfig\'>","$data":{"repeats":100,"repetition_period":0.0005,"results_format":{"$type":"<class \'qat.purr.compiler.config.QuantumResultsFormat\'>","$data":{"format":{"$type":"<enum \'qat.purr.compiler.config.InlineResultsProcessing\'>","$value":1},"transforms":{"$type":"<enum \'qat.purr.compiler.config.ResultsFormatting\'>","$value":3}}},"metrics":{"$type":"<enum \'qat.purr.compiler.config.MetricsType\'>","$value":6},"active_calibrations":[],"optimizations":{"$type":"<enum \'qat.purr.compiler.config.TketOptimizations\'>","$value":1}}}'
+
+
+def test_config_builder_is_valid_json():
+    config = json.loads(_config_builder(shots=10, optimization=2, res_format="squash_binary_result_arrays"))
+    data = config["$data"]
+    assert data["repeats"] == 10
+    assert data["repetition_period"] is None
+    assert data["results_format"]["$data"]["format"]["$value"] == 2
+    assert data["results_format"]["$data"]["transforms"]["$value"] == 6
+    assert data["optimizations"]["$value"] == 30
+
+
+def test_config_builder_cached():
+    _config_builder.cache_clear()
+    first = _config_builder(shots=100, optimization=1, res_format="raw")
+    second = _config_builder(shots=100, optimization=1, res_format="raw")
+    assert first is second
+    assert _config_builder.cache_info().hits == 1
+    _config_builder(shots=200, optimization=1, res_format="raw")
+    assert _config_builder.cache_info().misses == 2
 
 
 def test_optimization_options_builder():
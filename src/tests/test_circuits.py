@@ -11,3 +11,15 @@ def test_ghz():
     circuit = ghz()
     ghz_test = """OPENQASM 3.0;\ninclude "qelib1.inc";\nqreg q[3];\ncreg meas[3];\nh q[0];\ncx q[0],q[1];\ncx q[0],q[2];\nbarrier q[0],q[1],q[2];\nmeasure q[0] -> meas[0];\nmeasure q[1] -> meas[1];\nmeasure q[2] -> meas[2];"""
     assert circuit.strip() == ghz_test.strip()
+
+
+def test_bell_qubits():
+    circuit = bell(qc=3, qt=5)
+    bell_test = """OPENQASM 3.0;\ninclude "qelib1.inc";\nqreg q[2];\ncreg c[2];\nh q[3];\ncx q[3],q[5];\nmeasure q[3] -> c[0];\nmeasure q[5] -> c[1];"""
+    assert circuit == bell_test
+
+
+def test_ghz_qubits():
+    circuit = ghz(qc=4, qt1=2, qt2=7)
+    ghz_test = """OPENQASM 3.0;\ninclude "qelib1.inc";\nqreg q[3];\ncreg meas[3];\nh q[4];\ncx q[4],q[2];\ncx q[4],q[7];\nbarrier q[4],q[2],q[7];\nmeasure q[4] -> meas[0];\nmeasure q[2] -> meas[1];\nmeasure q[7] -> meas[2];"""
+    assert circuit == ghz_test
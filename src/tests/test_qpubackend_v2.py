@@ -1,7 +1,9 @@
+import asyncio
 import pytest
+import threading
 import unittest
-from unittest.mock import patch
-from qmio.backends import QPUBackend
+from unittest.mock import AsyncMock, Mock, patch, call
+from qmio.backends import AsyncQPUBackend, QPUBackend
 import time
 
 
@@ -16,14 +18,59 @@ def test_qpu_backend_init():
     assert backend._verification_cmd is None
 
 
-@patch("qmio.backends.run")
-def test_verify_connection_success(mock_run):
+@patch("qmio.backends.socket.create_connection")
+def test_verify_connection_success(mock_create_connection):
     backend = QPUBackend(address="tcp://127.0.0.1:1234")
-    # Simulamos que el comando de verificación se ejecuta sin errores
-    mock_run.return_value = ("Success", "")
     backend._verify_connection()
-    # Verificamos que se ejecuta el comando adecuado
-    mock_run.assert_called_once_with("nc -zv 127.0.0.1 1234")
+    # Verificamos que se abre y cierra una conexión al endpoint adecuado
+    mock_create_connection.assert_called_once_with(("127.0.0.1", 1234), timeout=1.0)
+    mock_create_connection.return_value.close.assert_called_once()
+    assert backend._verification_cmd == "nc -zv 127.0.0.1 1234"
+
+
+@patch("qmio.backends.socket.create_connection", side_effect=OSError("Connection refused"))
+def test_verify_connection_refused(mock_create_connection):
+    backend = QPUBackend(address="tcp://127.0.0.1:1234")
+    with pytest.raises(ConnectionRefusedError):
+        backend._verify_connection()
+
+
+@patch("qmio.backends._ENDPOINT_RE")
+@patch("qmio.backends.socket.create_connection")
+def test_verify_connection_cached_endpoint(mock_create_connection, mock_endpoint_re):
+    mock_endpoint_re.match.return_value.group.side_effect = ["127.0.0.1", "1234"]
+    backend = QPUBackend(address="tcp://127.0.0.1:1234")
+    backend._verify_ttl = 0
+    backend._verify_connection()
+    backend._verify_connection()
+    # El endpoint se analiza una sola vez y se reutiliza
+    mock_endpoint_re.match.assert_called_once_with("tcp://127.0.0.1:1234")
+    assert backend._endpoint_ip == "127.0.0.1"
+    assert backend._endpoint_port == 1234
+    assert mock_create_connection.call_count == 2
+
+
+@patch("qmio.backends.socket.create_connection")
+def test_verify_connection_recently_verified(mock_create_connection):
+    backend = QPUBackend(address="tcp://127.0.0.1:1234")
+    backend._verify_connection()
+    backend._verify_connection()
+    # Una verificación reciente del mismo endpoint no se repite
+    mock_create_connection.assert_called_once()
+    with patch("qmio.backends.time.monotonic", return_value=1e9):
+        backend._verify_connection()
+    assert mock_create_connection.call_count == 2
+
+
+@patch("qmio.backends.socket.create_connection")
+def test_verify_connection_failure_not_cached(mock_create_connection):
+    mock_create_connection.side_effect = [OSError("refused"), mock_create_connection.return_value]
+    backend = QPUBackend(address="tcp://127.0.0.1:1234")
+    with pytest.raises(ConnectionRefusedError):
+        backend._verify_connection()
+    # Los fallos no se recuerdan
+    backend._verify_connection()
+    assert mock_create_connection.call_count == 2
 
 
 def test_verify_connection_failure():
@@ -34,26 +81,32 @@ def test_verify_connection_failure():
 
 @patch("qmio.backends.SlurmClient")
 @patch("qmio.backends.ZMQClient")
-@patch("qmio.backends.run")
-def test_connect(mock_run, mock_zmqclient, mock_slurmclient):
+@patch("qmio.backends.socket.create_connection")
+def test_connect(mock_create_connection, mock_zmqclient, mock_slurmclient):
     backend = QPUBackend()
     # Simulamos que el cliente de slurm devuelve un job_id y un endpoint
     mock_slurmclient_instance = mock_slurmclient.return_value
-    mock_slurmclient_instance.submit_and_wait.return_value = ("12345", "tcp://127.0.0.1:1234")
-    # Simulamos que la función run devuelve stdout y stderr de un comando 'sbatch'
-    mock_run.return_value = ("Submitted batch job 12345", "")
-    # Simulamos que el comando de verificación de conexión retorna un resultado exitoso
-    mock_run.side_effect = [
-        ("Submitted batch job 12345", ""),  # Primer llamado: ejecución de submit_and_wait
-        ("Connection to 127.0.0.1 1234 port [tcp/*] succeeded!", "")  # Segundo llamado: ejecución de verificación de conexión
-    ]
+    mock_slurmclient_instance.submit_and_wait.return_value = ("12345", "127.0.0.1", 1234)
     backend.connect()
-    # Verificamos que se ejecuta el comando de verificación de conexión
-    mock_run.assert_any_call("nc -zv 127.0.0.1 1234")
+    # Verificamos que se comprueba la conexión con el endpoint del túnel
+    mock_create_connection.assert_any_call(("127.0.0.1", 1234), timeout=1.0)
     # Verificamos que se establece el cliente ZMQ correctamente
     mock_zmqclient.assert_called_once_with(address="tcp://127.0.0.1:1234")
 
 
+@patch("qmio.backends.wait_until")
+@patch("qmio.backends.SlurmClient")
+@patch("qmio.backends.ZMQClient")
+@patch("qmio.backends.socket.create_connection", side_effect=OSError("Connection refused"))
+def test_connect_unreachable(mock_create_connection, mock_zmqclient, mock_slurmclient, mock_wait_until):
+    backend = QPUBackend()
+    mock_slurmclient.return_value.submit_and_wait.return_value = ("12345", "127.0.0.1", 1234)
+    mock_wait_until.return_value = False
+    with pytest.raises(ConnectionRefusedError):
+        backend.connect()
+    mock_zmqclient.assert_not_called()
+
+
 @patch("qmio.backends.SlurmClient")
 @patch("qmio.backends.ZMQClient")
 def test_disconnect(mock_zmqclient, mock_slurmclient):
@@ -87,19 +140,39 @@ def test_disconnect_with_exception(mock_zmqclient, mock_slurmclient):
     # Simulamos que el trabajo de slurm sigue ejecutándose
     mock_slurmclient_instance = mock_slurmclient.return_value
     mock_slurmclient_instance._is_job_running.side_effect = [True, True, False]  # Cambiar a False después de dos llamadas
-    # Configuramos scancel para lanzar una excepción la primera vez que se llama
-    mock_slurmclient_instance.scancel.side_effect = [Exception("Cancel failed"), None]
+    # Configuramos scancel para lanzar una excepción
+    mock_slurmclient_instance.scancel.side_effect = Exception("Cancel failed")
     # Ejecutamos disconnect()
     backend.disconnect()
-    # Verificamos que se intenta cancelar el trabajo
-    assert mock_slurmclient_instance.scancel.call_count == 2  # Se espera que se intente cancelar dos veces
-    assert mock_slurmclient_instance.scancel.call_args_list[0][0] == ("12345",)  # Primera llamada con excepción
-    assert mock_slurmclient_instance.scancel.call_args_list[1][0] == ("12345",)  # Segunda llamada sin excepción
+    # Verificamos que se cancela una sola vez y se espera a que el trabajo termine
+    mock_slurmclient_instance.scancel.assert_called_once_with("12345")
+    assert mock_slurmclient_instance._is_job_running.call_count == 3
+    assert backend._job_id is None
 
     # Verificamos que el cliente ZMQ se cierra
     mock_zmqclient_instance.close.assert_called_once()  # Usa la instancia simulada para verificar el cierre
 
 
+@patch("qmio.backends.wait_until", return_value=False)
+@patch("qmio.backends.SlurmClient")
+@patch("qmio.backends.ZMQClient")
+def test_disconnect_timeout(mock_zmqclient, mock_slurmclient, mock_wait_until):
+    backend = QPUBackend()
+    mock_zmqclient_instance = mock_zmqclient.return_value
+    backend.client = mock_zmqclient_instance
+    backend._slurmclient = mock_slurmclient.return_value
+    backend._job_id = "12345"
+    # El trabajo no termina tras el scancel
+    mock_slurmclient.return_value._is_job_running.return_value = True
+    with pytest.raises(TimeoutError):
+        backend.disconnect()
+    mock_slurmclient.return_value.scancel.assert_called_once_with("12345")
+    # El cliente se cierra igualmente y se conserva el job_id para reintentar
+    mock_zmqclient_instance.close.assert_called_once()
+    assert backend.client is None
+    assert backend._job_id == "12345"
+
+
 @patch("qmio.backends.SlurmClient")
 @patch("qmio.backends.ZMQClient")
 def test_disconnect_with_close_exception(mock_zmqclient, mock_slurmclient):
@@ -185,7 +258,7 @@ def test_run(mock_slurmclient, mock_zmqclient):
     # Ejecutamos el método `run`
     result = backend.run("dummy_circuit", shots=100)
     # Verificamos que el cliente ZMQ haya enviado el trabajo
-    mock_zmqclient_instance._send.assert_called_once_with(("dummy_circuit", '{"$type": "<class \'qat.purr.compiler.config.CompilerConfig\'>", "$data": {"repeats": 100, "repetition_period": null, "results_format": {"$type": "<class \'qat.purr.compiler.config.QuantumResultsFormat\'>", "$data": {"format": {"$type": "<enum \'qat.purr.compiler.config.InlineResultsProcessing\'>", "$value": 1}, "transforms": {"$type": "<enum \'qat.purr.compiler.config.ResultsFormatting\'>", "$value": 3}}}, "metrics": {"$type": "<enum \'qat.purr.compiler.config.MetricsType\'>", "$value": 6}, "active_calibrations": [], "optimizations": {"$type": "<enum \'qat.purr.compiler.config.TketOptimizations\'>", "$value": 1}}}'))
+    mock_zmqclient_instance._send.assert_called_once_with(("dummy_circuit", '{"$type":"<class \'qat.purr.compiler.config.CompilerConfig\'>","$data":{"repeats":100,"repetition_period":null,"results_format":{"$type":"<class \'qat.purr.compiler.config.QuantumResultsFormat\'>","$data":{"format":{"$type":"<enum \'qat.purr.compiler.config.InlineResultsProcessing\'>","$value":1},"transforms":{"$type":"<enum \'qat.purr.compiler.config.ResultsFormatting\'>","$value":3}}},"metrics":{"$type":"<enum \'qat.purr.compiler.config.MetricsType\'>","$value":6},"active_calibrations":[],"optimizations":{"$type":"<enum \'qat.purr.compiler.config.TketOptimizations\'>","$value":1}}}'))
     # Verificamos que se devuelvan los resultados correctos
     assert result == "result"
 
@@ -224,3 +297,123 @@ def test_run_state_flush(mock_slurmclient, mock_zmqclient):
         result = backend.run("dummy_circuit", shots=100)
         mock_state_flush.assert_called_once()  # Verifica que _state_flush fue llamado
         assert result == "result"
+
+
+@patch("qmio.backends._config_builder")
+@patch("qmio.backends.ZMQClient")
+def test_run_batch(mock_zmqclient, mock_config_builder):
+    backend = QPUBackend()
+    backend.client = mock_zmqclient.return_value
+    mock_zmqclient_instance = mock_zmqclient.return_value
+    mock_zmqclient_instance._await_results.side_effect = ["result_1", "result_2"]
+    mock_config_builder.return_value = "config"
+
+    results = backend.run_batch(["circuit_1", "circuit_2"], shots=100)
+
+    # La configuración se construye una sola vez para todo el lote
+    mock_config_builder.assert_called_once()
+    assert mock_zmqclient_instance._send.call_args_list == [
+        call(("circuit_1", "config")),
+        call(("circuit_2", "config")),
+    ]
+    assert results == ["result_1", "result_2"]
+
+
+def test_run_batch_no_client():
+    backend = QPUBackend()
+    with pytest.raises(RuntimeError):
+        backend.run_batch(["dummy_circuit"], shots=100)
+
+
+def test_qpu_backend_endpoint_port_initialized():
+    backend = QPUBackend(address="tcp://127.0.0.1:1234")
+    assert backend._endpoint_port is None
+
+
+@patch("qmio.backends.AsyncZMQClient")
+def test_async_backend_new_client(mock_async_zmqclient):
+    backend = AsyncQPUBackend(address="tcp://127.0.0.1:1234")
+    # El backend asíncrono crea un cliente asyncio
+    assert backend._new_client() is mock_async_zmqclient.return_value
+    mock_async_zmqclient.assert_called_once_with(address="tcp://127.0.0.1:1234")
+
+
+@patch("qmio.backends._config_builder", return_value="config")
+def test_async_run(mock_config_builder):
+    backend = AsyncQPUBackend()
+    backend.client = AsyncMock()
+    backend.client.request.return_value = "result"
+
+    assert asyncio.run(backend.run("circuit", shots=100)) == "result"
+    backend.client.request.assert_awaited_once_with(("circuit", "config"))
+
+
+@patch("qmio.backends._config_builder", return_value="config")
+def test_async_run_batch(mock_config_builder):
+    backend = AsyncQPUBackend()
+    backend.client = AsyncMock()
+    backend.client.request.side_effect = ["result_1", "result_2"]
+
+    results = asyncio.run(backend.run_batch(["circuit_1", "circuit_2"], shots=100))
+    assert results == ["result_1", "result_2"]
+    mock_config_builder.assert_called_once()
+    assert backend.client.request.await_args_list == [
+        call(("circuit_1", "config")),
+        call(("circuit_2", "config")),
+    ]
+
+
+@patch("qmio.backends._config_builder", return_value="config")
+def test_async_run_connection_check_off_loop(mock_config_builder):
+    backend = AsyncQPUBackend()
+    backend.client = AsyncMock()
+    backend.client.request.return_value = "result"
+    other_ran = threading.Event()
+
+    def slow_check():
+        # La comprobación (squeue, reconexión...) bloquea hasta que otra
+        # tarea avanza: solo es posible si no se ejecuta en el bucle
+        assert other_ran.wait(5)
+
+    backend._ensure_connection = slow_check
+
+    async def other():
+        await asyncio.sleep(0)
+        other_ran.set()
+        return "other"
+
+    async def main():
+        return await asyncio.gather(backend.run("circuit", shots=100), other())
+
+    assert asyncio.run(main()) == ["result", "other"]
+
+
+@patch("qmio.backends._config_builder", return_value="config")
+def test_async_concurrent_runs_reconnect_once(mock_config_builder):
+    backend = AsyncQPUBackend()
+    backend.client = AsyncMock()
+    backend.client.request.return_value = "result"
+    backend._job_id = "1"
+    backend._slurmclient = Mock()
+    # El túnel "1" ha terminado; tras reconectar corre el "2"
+    backend._slurmclient._is_job_running.side_effect = lambda job_id: job_id == "2"
+
+    def flush():
+        time.sleep(0.05)
+        backend._job_id = "2"
+
+    backend._state_flush = Mock(side_effect=flush)
+
+    async def main():
+        return await asyncio.gather(
+            backend.run("circuit_1", shots=100), backend.run("circuit_2", shots=100)
+        )
+
+    assert asyncio.run(main()) == ["result", "result"]
+    backend._state_flush.assert_called_once()
+
+
+def test_async_run_no_client():
+    backend = AsyncQPUBackend()
+    with pytest.raises(RuntimeError):
+        asyncio.run(backend.run("dummy_circuit", shots=100))
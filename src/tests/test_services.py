@@ -1,6 +1,6 @@
 import pytest
 
-from qmio.backends import QPUBackend
+from qmio.backends import AsyncQPUBackend, QPUBackend
 from qmio.services import QmioRuntimeService
 
 
@@ -17,3 +17,10 @@ def test_backend_selection(runtime_service):
 def test_invalid_backend_name(runtime_service):
     with pytest.raises(ValueError):
         runtime_service.backend(name="invalidBackend")
+
+
+def test_async_backend_selection(runtime_service):
+    backend = runtime_service.async_backend(name="qpu")
+    assert isinstance(backend, AsyncQPUBackend)
+    with pytest.raises(ValueError):
+        runtime_service.async_backend(name="invalidBackend")
@@ -1,11 +1,21 @@
 import pytest
 import os
-from unittest.mock import patch, call
-from qmio.clients import SlurmClient
+import threading
+from unittest.mock import ANY, patch, call
+from qmio.clients import SlurmClient, _partition_node_ip
 from qmio.utils import RunCommandError
 from config import TUNNEL_TIME_LIMIT
 
 
+@pytest.fixture(autouse=True)
+def reset_job_states():
+    # Los estados de los jobs se comparten entre instancias
+    SlurmClient._watched_jobs = set()
+    SlurmClient._job_states = {}
+    SlurmClient._last_poll = float("-inf")
+    _partition_node_ip.cache_clear()
+
+
 class TestSlurmClient:
     @patch("qmio.clients.run")  # Reemplaza con el path correcto
     def test_scancel(self, mock_run):
@@ -17,25 +27,80 @@ class TestSlurmClient:
         # Verificamos que se llame a 'run' con el comando correcto
         client.scancel()
         mock_run.assert_has_calls([
-            call("scancel 12345"),
-            call("scancel 12345")  # O el valor adecuado según el comportamiento
+            call(["scancel", "12345"]),
+            call(["scancel", "12345"])  # O el valor adecuado según el comportamiento
         ])
 
     @patch("qmio.clients.run")
     def test_is_job_running(self, mock_run):
         # Instancia del cliente
         client = SlurmClient()
+        client._poll_cache_seconds = 0
         # Caso cuando el trabajo está corriendo
-        mock_run.return_value = ("RUNNING", "")
+        mock_run.return_value = ("12345 RUNNING\n", "")
         assert client._is_job_running(12345) is True
+        # Verificamos que se llamó con el comando correcto
+        mock_run.assert_called_with(["squeue", "-h", "-j", "12345", "-o", "%i %T"])
         # Caso cuando el trabajo no está corriendo
+        mock_run.return_value = ("12345 PENDING\n", "")
+        assert client._is_job_running(12345) is False
+        # El job ya no está en la cola
         mock_run.return_value = ("", "")
         assert client._is_job_running(12345) is False
-        # Verificamos que se llamó con el comando correcto
-        mock_run.assert_called_with("scontrol show job 12345")
+        assert SlurmClient._watched_jobs == set()
         client._job_id = 54321
         client._is_job_running(job_id=None)
-        mock_run.assert_called_with("scontrol show job 54321")
+        mock_run.assert_called_with(["squeue", "-h", "-j", "54321", "-o", "%i %T"])
+
+    @patch("qmio.clients.run")
+    def test_is_job_running_coalesced(self, mock_run):
+        client_a = SlurmClient()
+        client_b = SlurmClient()
+        mock_run.return_value = ("1 PENDING\n", "")
+        assert client_a._is_job_running("1") is False
+        # Un job nuevo fuerza una consulta que incluye a todos los vigilados
+        mock_run.return_value = ("1 RUNNING\n2 PENDING\n", "")
+        assert client_b._is_job_running("2") is False
+        mock_run.assert_called_with(["squeue", "-h", "-j", "1,2", "-o", "%i %T"])
+        # Dentro de la ventana de caché no se vuelve a llamar a squeue
+        assert client_a._is_job_running("1") is True
+        assert mock_run.call_count == 2
+        # scancel invalida el estado del job
+        client_a.scancel("1")
+        mock_run.return_value = ("2 PENDING\n", "")
+        assert client_a._is_job_running("1") is False
+        assert mock_run.call_count == 4
+
+    @patch.object(SlurmClient, "_poll_cache_seconds", 0)
+    @patch("qmio.clients.run")
+    def test_is_job_running_threads(self, mock_run):
+        active = []
+        overlapped = threading.Event()
+
+        def squeue(cmd):
+            # Todos los jobs consultados están en marcha
+            active.append(cmd)
+            if len(active) > 1:
+                overlapped.set()
+            threading.Event().wait(0.01)
+            active.remove(cmd)
+            return "".join(f"{job} RUNNING\n" for job in cmd[3].split(",")), ""
+
+        mock_run.side_effect = squeue
+        results = {}
+
+        def check(job_id):
+            results[job_id] = SlurmClient()._is_job_running(job_id)
+
+        threads = [threading.Thread(target=check, args=(str(job),)) for job in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # Ningún hilo pierde el job de otro y squeue nunca se solapa
+        assert results == {str(job): True for job in range(8)}
+        assert SlurmClient._watched_jobs == {str(job) for job in range(8)}
+        assert not overlapped.is_set()
 
 
     @patch("qmio.clients.run")
@@ -49,97 +114,156 @@ class TestSlurmClient:
         assert ip == "10.120.1.10"
 
         # Verificamos que se llama con el comando correcto
-        mock_run.assert_called_with("scontrol show partition backend1")
+        mock_run.assert_called_with(["scontrol", "show", "partition", "backend1"])
 
         # Probamos que lanza una excepción si no encuentra nodos
+        _partition_node_ip.cache_clear()
         mock_run.return_value = ("", "")
         with pytest.raises(ValueError):
             client._check_backend_node("backend1")
 
-        with pytest.raises(RunCommandError):
+        with pytest.raises(ValueError, match="No backend specified"):
             client._check_backend_node(backend=None)
 
+    @patch("qmio.clients.run", return_value=("Nodes=c1-10", ""))
+    def test_check_backend_node_cached(self, mock_run):
+        client = SlurmClient()
+        assert client._check_backend_node("backend1") == "10.120.1.10"
+        assert SlurmClient()._check_backend_node("backend1") == "10.120.1.10"
+        # Dentro del mismo minuto solo se consulta a Slurm una vez
+        mock_run.assert_called_once()
+        with patch("qmio.clients.monotonic", return_value=1e9):
+            client._check_backend_node("backend1")
+        assert mock_run.call_count == 2
+
     @patch("qmio.clients.run")
-    @patch("random.randint")
+    @patch.object(SlurmClient, "_pick_port")
     @patch("time.sleep")
     @patch.object(SlurmClient, '_is_job_running')
     @patch.object(SlurmClient, '_check_backend_node')
-    def test_submit_and_wait(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_randint, mock_run):
+    def test_submit_and_wait(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_pick_port, mock_run):
         # Instancia del cliente
         client = SlurmClient()
 
         # Mock de valores que devuelve cada función
-        mock_randint.return_value = 650
-        mock_run.return_value = ("Submitted batch job 12345", "")
+        mock_pick_port.return_value = 650
+        mock_run.return_value = ("12345\n", "")
         mock_is_job_running.side_effect = [False, False, True]  # Simula que el trabajo empieza después de algunos intentos
         mock_check_backend_node.return_value = "10.120.1.10"
 
         # Llamamos al método a probar
-        job_id, endpoint = client.submit_and_wait(backend="backend1")
+        job_id, ip, port = client.submit_and_wait(backend="qpu")
 
         # Verificamos los resultados
         assert job_id == "12345"
-        assert endpoint == "tcp://10.120.1.10:650"
+        assert ip == "10.120.1.10"
+        assert port == 650
 
         current_dir = os.path.dirname(os.path.dirname(__file__))
-        expected_script_path = os.path.join(current_dir, "qmio", "slurm_scripts", "backend1.sh")
+        expected_script_path = os.path.join(current_dir, "qmio", "slurm_scripts", "qpu.sh")
         expected_time_limit = TUNNEL_TIME_LIMIT
         # Verificamos que se generaron los comandos correctos
-        mock_run.assert_called_with(f"sbatch --time={expected_time_limit} {expected_script_path} 650")
+        mock_run.assert_called_with(["sbatch", "--parsable", f"--time={expected_time_limit}", expected_script_path, "650"])
         mock_is_job_running.assert_called_with("12345")
-        mock_check_backend_node.assert_called_with("backend1")
+        mock_check_backend_node.assert_called_with("qpu")
+        mock_pick_port.assert_called_once_with("10.120.1.10")
 
         with pytest.raises(ValueError):
             client.submit_and_wait(backend=None)
+        # Solo se aceptan backends con script de túnel
+        with pytest.raises(ValueError):
+            client.submit_and_wait(backend="qpu; rm -rf ~")
 
     @patch("qmio.clients.run")
-    @patch("random.randint")
+    @patch.object(SlurmClient, "_pick_port")
     @patch("time.sleep")
     @patch.object(SlurmClient, '_is_job_running')
     @patch.object(SlurmClient, '_check_backend_node')
-    def test_submit_and_wait_reservation(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_randint, mock_run):
+    def test_submit_and_wait_reservation(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_pick_port, mock_run):
         # Instancia del cliente
         reservation_name = "reserva_alvaro"
         client = SlurmClient(reservation_name=reservation_name)
 
         # Mock de valores que devuelve cada función
-        mock_randint.return_value = 650
-        mock_run.return_value = ("Submitted batch job 12345", "")
+        mock_pick_port.return_value = 650
+        mock_run.return_value = ("12345\n", "")
         mock_is_job_running.side_effect = [False, False, True]  # Simula que el trabajo empieza después de algunos intentos
         mock_check_backend_node.return_value = "10.120.1.10"
 
         # Llamamos al método a probar
-        job_id, endpoint = client.submit_and_wait(backend="backend1")
+        job_id, ip, port = client.submit_and_wait(backend="qpu")
 
         # Verificamos los resultados
         assert job_id == "12345"
-        assert endpoint == "tcp://10.120.1.10:650"
+        assert ip == "10.120.1.10"
+        assert port == 650
 
         current_dir = os.path.dirname(os.path.dirname(__file__))
-        expected_script_path = os.path.join(current_dir, "qmio", "slurm_scripts", "backend1.sh")
+        expected_script_path = os.path.join(current_dir, "qmio", "slurm_scripts", "qpu.sh")
         expected_time_limit = TUNNEL_TIME_LIMIT
         # Verificamos que se generaron los comandos correctos
 
-        mock_run.assert_called_with(f"sbatch --reservation='{reservation_name}' --time={expected_time_limit} {expected_script_path} 650")
+        mock_run.assert_called_with(["sbatch", "--parsable", f"--reservation={reservation_name}", f"--time={expected_time_limit}", expected_script_path, "650"])
         mock_is_job_running.assert_called_with("12345")
-        mock_check_backend_node.assert_called_with("backend1")
+        mock_check_backend_node.assert_called_with("qpu")
+        mock_pick_port.assert_called_once_with("10.120.1.10")
 
         with pytest.raises(ValueError):
             client.submit_and_wait(backend=None)
 
 
+    @patch("qmio.clients.run")
+    @patch.object(SlurmClient, '_is_job_running', return_value=True)
+    @patch.object(SlurmClient, '_check_backend_node', return_value="10.120.1.10")
+    def test_submit_and_wait_endpoint_port(self, mock_check_backend_node, mock_is_job_running, mock_run):
+        client = SlurmClient()
+        mock_run.return_value = ("12345\n", "")
+        # Si se indica un puerto se usa en lugar de uno aleatorio
+        assert client.submit_and_wait(endpoint_port=700, backend="qpu") == ("12345", "10.120.1.10", 700)
+        assert mock_run.call_args[0][0][-1] == "700"
+
+    @patch("qmio.clients.run", return_value=("12345\n", ""))
+    @patch.object(SlurmClient, '_is_job_running', side_effect=[False, False, True])
+    @patch.object(SlurmClient, '_check_backend_node', return_value="10.120.1.10")
+    def test_submit_and_wait_progress_on_stderr(self, mock_check_backend_node, mock_is_job_running, mock_run, capsys):
+        client = SlurmClient()
+        client.submit_and_wait(endpoint_port=650, backend="qpu")
+        captured = capsys.readouterr()
+        # El progreso va a stderr y no ensucia stdout
+        assert captured.out == ""
+        # Solo se imprime una vez dentro de la ventana de 3 segundos
+        assert captured.err.count("Waiting for resources") == 1
+        assert "Job started" in captured.err
+
+    @patch.object(SlurmClient, "_port_in_use", side_effect=[True, True, False])
+    def test_pick_port(self, mock_port_in_use):
+        client = SlurmClient()
+        port = client._pick_port("10.120.1.10")
+        # Se descartan los puertos ocupados en el nodo
+        assert 600 <= port < 700
+        assert mock_port_in_use.call_count == 3
+        mock_port_in_use.assert_called_with("10.120.1.10", port)
+
+    @patch.object(SlurmClient, "_port_in_use", return_value=True)
+    def test_pick_port_exhausted(self, mock_port_in_use):
+        client = SlurmClient()
+        with pytest.raises(RuntimeError):
+            client._pick_port("10.120.1.10")
+        assert mock_port_in_use.call_count == client._port_tries
+
+
     # @patch("qmio.clients.run")
     # @patch("random.randint")
     # @patch("time.sleep")
     # @patch.object(SlurmClient, '_is_job_running')
     # @patch.object(SlurmClient, '_check_backend_node')
-    # def test_submit_and_wait_no_backend(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_randint, mock_run):
+    # def test_submit_and_wait_no_backend(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_pick_port, mock_run):
     #     # Instancia del cliente
     #     client = SlurmClient()
 
     #     # Mock de valores que devuelve cada función
     #     mock_randint.return_value = 650
-    #     mock_run.return_value = ("Submitted batch job 12345", "")
+    #     mock_run.return_value = ("12345\n", "")
     #     mock_is_job_running.side_effect = [False, False, True]  # Simula que el trabajo empieza después de algunos intentos
     #     mock_check_backend_node.return_value = "10.120.1.10"
 
@@ -149,49 +273,188 @@ class TestSlurmClient:
 
 
     @patch("qmio.clients.run")
-    @patch("random.randint")
+    @patch.object(SlurmClient, "_pick_port")
     @patch("time.sleep")
     @patch.object(SlurmClient, '_is_job_running')
     @patch.object(SlurmClient, '_check_backend_node')
-    def test_submit_and_wait_failed_job_id_found(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_randint, mock_run):
+    def test_submit_and_wait_failed_job_id_found(self, mock_check_backend_node, mock_is_job_running, mock_sleep, mock_pick_port, mock_run):
         # Instancia del cliente
         client = SlurmClient()
 
         # Mock de valores que devuelve cada función
-        mock_randint.return_value = 650
-        mock_run.return_value = ("Submitted batch job NON_JOB_ID", "")
+        mock_pick_port.return_value = 650
+        mock_run.return_value = ("NON_JOB_ID\n", "")
         mock_is_job_running.side_effect = [False, False, True]  # Simula que el trabajo empieza después de algunos intentos
         mock_check_backend_node.return_value = "NON_IP"
 
         # Llamamos al método a probar
         with pytest.raises(RunCommandError):
-            job_id, endpoint = client.submit_and_wait(backend="backend1")
+            client.submit_and_wait(backend="qpu")
 
 
+    @patch.object(SlurmClient, '_check_backend_node', return_value="10.120.1.10")
+    @patch.object(SlurmClient, '_pick_port', return_value=650)
     @patch.object(SlurmClient, '_is_job_running', return_value=False)  # Simular que el job no arranca nunca
     @patch("qmio.clients.run")
     @patch('time.sleep', return_value=None)  # Simular que sleep no tarda nada
-    def test_submit_and_wait_timeout(self, mock_sleep, mock_run, mock_is_job_running):
+    def test_submit_and_wait_timeout(self, mock_sleep, mock_run, mock_is_job_running, mock_pick_port, mock_check_backend_node):
         client = SlurmClient()
 
         # Asegúrate de que mock_run devuelva dos valores como espera el código
-        mock_run.return_value = ("Submitted batch job 12345", "")  # stdout, stderr
-        client._max_retries = 2  # Poco tiempo para el time out
+        mock_run.return_value = ("12345\n", "")  # stdout, stderr
+        client._max_wait = 0  # Poco tiempo para el time out
 
         # Verificamos que al alcanzar el timeout se lanza el TimeoutError
         with pytest.raises(TimeoutError, match="Tunnel did not start withing the 8h time frame"):
-            client.submit_and_wait(backend="backend1")
+            client.submit_and_wait(backend="qpu")
+        # El job que no llegó a arrancar se cancela
+        mock_run.assert_called_with(["scancel", "12345"])
 
 
+    @patch.object(SlurmClient, '_check_backend_node', return_value="10.120.1.10")
+    @patch.object(SlurmClient, '_pick_port', return_value=650)
     @patch.object(SlurmClient, '_is_job_running', side_effect=KeyboardInterrupt)  # Simular un KeyboardInterrupt
     @patch.object(SlurmClient, 'scancel')  # Mockear el método scancel
     @patch("qmio.clients.run")
-    def test_submit_and_wait_keyboard_interrupt(self, mock_run, mock_scancel, mock_is_job_running):
+    def test_submit_and_wait_keyboard_interrupt(self, mock_run, mock_scancel, mock_is_job_running, mock_pick_port, mock_check_backend_node):
         client = SlurmClient()
         client._job_id = "12345"  # Mockear el job_id
         # Simular que run devuelve stdout y stderr (tupla con dos valores)
-        mock_run.return_value = ("Submitted batch job 12345", "")
+        mock_run.return_value = ("12345\n", "")
         # Verificamos que se lanza SystemExit al interrumpir con teclado
-        client.submit_and_wait(backend="backend1")
+        assert client.submit_and_wait(backend="qpu") == (None, None, None)
         mock_scancel.assert_called_once_with("12345")
         assert client._job_id is None
+
+    @patch.object(SlurmClient, "scancel")
+    @patch.object(SlurmClient, '_check_backend_node', return_value="10.120.1.10")
+    @patch.object(SlurmClient, '_pick_port', return_value=650)
+    @patch.object(SlurmClient, '_is_job_running', side_effect=RunCommandError("squeue failed"))
+    @patch("qmio.clients.run", return_value=("12345\n", ""))
+    def test_submit_and_wait_error_cancels_job(self, mock_run, mock_is_job_running, mock_pick_port, mock_check_backend_node, mock_scancel):
+        client = SlurmClient()
+        # Si squeue falla después del sbatch, el job enviado se cancela
+        with pytest.raises(RunCommandError, match="squeue failed"):
+            client.submit_and_wait(backend="qpu")
+        mock_scancel.assert_called_once_with("12345")
+        assert client._job_id is None
+        # Un fallo antes de enviar el job no cancela nada
+        mock_scancel.reset_mock()
+        mock_check_backend_node.side_effect = ValueError("No backend specified")
+        with pytest.raises(ValueError):
+            client.submit_and_wait(backend="qpu")
+        mock_scancel.assert_not_called()
+
+    @patch.object(SlurmClient, "submit_and_wait")
+    def test_submit_and_wait_many(self, mock_submit_and_wait):
+        # Ambos envíos tienen que estar en marcha a la vez para pasar la barrera
+        barrier = threading.Barrier(2, timeout=5)
+
+        def submit(backend, time_limit, stop):
+            barrier.wait()
+            return (f"job_{backend}", "10.120.1.10", 650)
+
+        mock_submit_and_wait.side_effect = submit
+        client = SlurmClient(reservation_name="reserva")
+        results = client.submit_and_wait_many(["qpu", "ilk"])
+
+        assert results == [
+            ("qpu", ("job_qpu", "10.120.1.10", 650)),
+            ("ilk", ("job_ilk", "10.120.1.10", 650)),
+        ]
+        mock_submit_and_wait.assert_any_call(backend="qpu", time_limit=TUNNEL_TIME_LIMIT, stop=ANY)
+        assert client.submit_and_wait_many([]) == []
+
+    @patch.object(SlurmClient, "scancel")
+    @patch.object(SlurmClient, "submit_and_wait")
+    def test_submit_and_wait_many_failure(self, mock_submit_and_wait, mock_scancel):
+        qpu_done = threading.Event()
+
+        def submit(backend, time_limit, stop):
+            if backend == "ilk":
+                # Falla cuando el otro túnel ya ha arrancado
+                qpu_done.wait(5)
+                raise RunCommandError("sbatch failed")
+            qpu_done.set()
+            return ("12345", "10.120.1.10", 650)
+
+        mock_submit_and_wait.side_effect = submit
+        client = SlurmClient()
+        with pytest.raises(RunCommandError):
+            client.submit_and_wait_many(["qpu", "ilk"])
+        # Los túneles que sí arrancaron se cancelan
+        mock_scancel.assert_called_once_with("12345")
+
+    @patch.object(SlurmClient, "scancel")
+    @patch.object(SlurmClient, "submit_and_wait")
+    def test_submit_and_wait_many_fails_fast(self, mock_submit_and_wait, mock_scancel):
+        stopped = []
+
+        def submit(backend, time_limit, stop):
+            if backend == "ilk":
+                raise RunCommandError("sbatch failed")
+            # El túnel de qpu sigue esperando hasta que se le pide parar
+            stopped.append(stop.wait(5))
+            return None, None, None
+
+        mock_submit_and_wait.side_effect = submit
+        client = SlurmClient()
+        with pytest.raises(RunCommandError):
+            client.submit_and_wait_many(["qpu", "ilk"])
+        # El error no espera a que arranquen los demás: se les manda parar
+        assert stopped == [True]
+        mock_scancel.assert_not_called()
+
+    @patch("qmio.clients.wait")
+    @patch.object(SlurmClient, "scancel")
+    @patch.object(SlurmClient, "submit_and_wait")
+    def test_submit_and_wait_many_keyboard_interrupt(self, mock_submit_and_wait, mock_scancel, mock_wait):
+        barrier = threading.Barrier(3, timeout=5)
+
+        def submit(backend, time_limit, stop):
+            barrier.wait()
+            return (f"job_{backend}", "10.120.1.10", 650)
+
+        def interrupted(*args, **kwargs):
+            # Ctrl-C llega con los dos envíos ya en marcha
+            barrier.wait()
+            raise KeyboardInterrupt
+
+        mock_submit_and_wait.side_effect = submit
+        mock_wait.side_effect = interrupted
+        client = SlurmClient()
+        with pytest.raises(KeyboardInterrupt):
+            client.submit_and_wait_many(["qpu", "ilk"])
+        # Ctrl-C en el hilo principal cancela todos los túneles enviados
+        mock_scancel.assert_has_calls([call("job_qpu"), call("job_ilk")], any_order=True)
+
+    @patch.object(SlurmClient, "scancel")
+    @patch.object(SlurmClient, '_check_backend_node', return_value="10.120.1.10")
+    @patch.object(SlurmClient, '_pick_port', return_value=650)
+    @patch("qmio.clients.run", return_value=("12345\n", ""))
+    def test_submit_and_wait_stop(self, mock_run, mock_pick_port, mock_check_backend_node, mock_scancel):
+        client = SlurmClient()
+        stop = threading.Event()
+        # Las esperas sobre el evento no bloquean en el test
+        stop.wait = lambda timeout=None: stop.is_set()
+
+        def not_running(job_id):
+            stop.set()
+            return False
+
+        # Si se pide parar mientras espera, el job se cancela
+        with patch.object(SlurmClient, "_is_job_running", side_effect=not_running):
+            assert client.submit_and_wait(backend="qpu", stop=stop) == (None, None, None)
+        mock_scancel.assert_called_once_with("12345")
+        assert client._job_id is None
+        # Con la parada ya pedida ni siquiera se envía el job
+        mock_run.reset_mock()
+        assert client.submit_and_wait(backend="qpu", stop=stop) == (None, None, None)
+        mock_run.assert_not_called()
+
+    def test_sbatch_prefix(self):
+        client = SlurmClient()
+        assert client._sbatch_prefix == ["sbatch", "--parsable"]
+        # Cambiar la reserva reconstruye el prefijo de sbatch
+        client.reservation_name = "reserva"
+        assert client._sbatch_prefix == ["sbatch", "--parsable", "--reservation=reserva"]
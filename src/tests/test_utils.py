@@ -1,43 +1,32 @@
 from config import MAX_TUNNEL_TIME_LIMIT
 import pytest
+import threading
+import time
 from unittest.mock import patch, MagicMock
-from qmio.utils import run, RunCommandError, time_to_seconds, time_within_time_limit
-
-
-@patch("qmio.utils.subprocess.run")
-def test_run_success(mock_subprocess_run):
-    # Simular la salida exitosa de subprocess.run
-    mock_completed_process = MagicMock()
-    mock_completed_process.returncode = 0
-    mock_completed_process.stdout = b'Success output'
-    mock_completed_process.stderr = b''
-    mock_subprocess_run.return_value = mock_completed_process
-    # Llamamos a la función run con el comando ficticio
-    stdout, stderr = run("fake command")
-    # Verificamos que la función devuelva stdout y stderr correctamente
-    assert stdout == "Success output"
-    assert stderr == ""
-    # Verificamos que subprocess.run fue llamado correctamente
-    mock_subprocess_run.assert_called_once_with("fake command", shell=True, capture_output=True, check=False)
-
-
-@patch("qmio.utils.subprocess.run")
-def test_run_failure(mock_subprocess_run):
-    # Simular que subprocess.run falla con un código de error
-    mock_completed_process = MagicMock()
-    mock_completed_process.returncode = 1
-    mock_completed_process.stdout = b''
-    mock_completed_process.stderr = b'Error occurred'
-    mock_subprocess_run.return_value = mock_completed_process
-    # Verificamos que la excepción RunCommandError se lanza en caso de error
-    with pytest.raises(RunCommandError, match="Error occurred"):
-        run("fake command")
+from qmio.utils import run, RunCommandError, time_to_seconds, time_within_time_limit, wait_until
+
+
+@pytest.mark.parametrize("returncode,stdout,stderr,error", [
+    (0, "Success output", "", None),
+    (1, "", "Error occurred", RunCommandError),
+])
+def test_run(subprocess_run_mock, completed_process_factory, returncode, stdout, stderr, error):
+    # Simular la salida de subprocess.run
+    subprocess_run_mock.return_value = completed_process_factory(returncode, stdout, stderr)
+    if error is None:
+        # Verificamos que la función devuelva stdout y stderr correctamente
+        assert run("fake command") == (stdout, stderr)
+    else:
+        # Verificamos que la excepción se lanza en caso de error
+        with pytest.raises(error, match=stderr):
+            run("fake command")
     # Verificamos que subprocess.run fue llamado correctamente
-    mock_subprocess_run.assert_called_once_with("fake command", shell=True, capture_output=True, check=False)
+    subprocess_run_mock.assert_called_once_with(["fake", "command"], capture_output=True, text=True, check=False)
 
 
 def test_time_to_seconds():
     assert time_to_seconds("00:03:00") == 180
+    assert time_to_seconds("01:02:03") == 3723
     time_limit_str = "00:70:00"
     with pytest.raises(ValueError, match=f"Time limit: '{time_limit_str}' has values out of range."):
         time_to_seconds(time_limit_str=time_limit_str)
@@ -53,3 +42,53 @@ def test_time_within_time_limit():
     time_limit = "00:50:00"
     with pytest.raises(ValueError, match=f"Time limit provided '{time_limit}' is outside of the maximun time limit '{MAX_TUNNEL_TIME_LIMIT}'."):
         time_within_time_limit(time_limit=time_limit)
+    # Un máximo distinto del de configuración también se respeta
+    assert time_within_time_limit("00:50:00", max_time_limit="01:00:00") is True
+
+
+def test_run_argv(subprocess_run_mock, completed_process_factory):
+    subprocess_run_mock.return_value = completed_process_factory()
+    # Una lista de argumentos se pasa tal cual, sin shell
+    run(["sbatch", "--reservation=my reservation", "script.sh"])
+    subprocess_run_mock.assert_called_once_with(["sbatch", "--reservation=my reservation", "script.sh"], capture_output=True, text=True, check=False)
+
+
+@patch("qmio.utils.subprocess.run", side_effect=FileNotFoundError("nc"))
+def test_run_command_not_found(mock_subprocess_run):
+    with pytest.raises(RunCommandError):
+        run("nc -zv 127.0.0.1 1234")
+
+
+@patch("qmio.utils.sleep")
+def test_wait_until(mock_sleep):
+    predicate = MagicMock(side_effect=[False, False, False, True])
+    assert wait_until(predicate, initial_delay=0.05, max_delay=0.1) is True
+    assert predicate.call_count == 4
+    # El tiempo de espera se duplica hasta el máximo
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [0.05, 0.1, 0.1]
+
+
+@patch("qmio.utils.sleep")
+def test_wait_until_timeout(mock_sleep):
+    assert wait_until(lambda: False, timeout=0) is False
+    mock_sleep.assert_not_called()
+
+
+@patch("qmio.utils.sleep")
+def test_wait_until_delayed_first_check(mock_sleep):
+    predicate = MagicMock(side_effect=[False, True])
+    assert wait_until(predicate, initial_delay=1.0, max_delay=10.0, initial_check=False) is True
+    # Se espera antes de la primera comprobación
+    assert predicate.call_count == 2
+    assert [c.args[0] for c in mock_sleep.call_args_list] == [1.0, 2.0]
+
+
+@patch("qmio.utils.sleep")
+def test_wait_until_stop(mock_sleep):
+    stop = threading.Event()
+    threading.Timer(0.01, stop.set).start()
+    start = time.monotonic()
+    # La espera se interrumpe en cuanto se activa el evento
+    assert wait_until(lambda: False, timeout=60, initial_delay=30.0, stop=stop) is False
+    assert time.monotonic() - start < 5
+    mock_sleep.assert_not_called()
@@ -1,19 +1,32 @@
+import asyncio
 import pytest
 import zmq
-from unittest.mock import MagicMock
-from qmio.clients import ZMQClient  # Asegúrate de cambiar esto a tu nombre de módulo
+from unittest.mock import AsyncMock, Mock, create_autospec, patch
+from qmio import clients
+from qmio.clients import AsyncZMQClient, ZMQClient  # Asegúrate de cambiar esto a tu nombre de módulo
+
+# Parte del socket de zmq que usan los clientes
+SOCKET_API = ["send_pyobj", "recv_pyobj", "connect", "close", "closed", "setsockopt"]
+
+
+@pytest.fixture(scope="module")
+def poller_autospec():
+    # El autospec introspecciona zmq.Poller: se construye una vez por módulo
+    return create_autospec(zmq.Poller)
 
 
 @pytest.fixture
-def zmq_client(mocker):
-    # Mockear el contexto y el socket de zmq
-    mock_context = mocker.patch('zmq.Context', autospec=True)
-    mock_socket = MagicMock()
-    mock_context.return_value.socket.return_value = mock_socket
-
-    client = ZMQClient(address="tcp://10.133.29.226:5556")
-    client._context = mock_context.return_value
-    client._socket = mock_socket
+def zmq_client(poller_autospec):
+    # El contexto se inyecta en el cliente, así que basta con un Mock simple
+    poller_autospec.reset_mock(return_value=True, side_effect=True)
+    mock_socket = Mock(spec=SOCKET_API, closed=False)
+    mock_context = Mock(spec=["socket", "destroy"])
+    mock_context.socket.return_value = mock_socket
+
+    with patch('zmq.Poller', new=poller_autospec):
+        client = ZMQClient(address="tcp://10.133.29.226:5556", context=mock_context)
+    mock_context.socket.assert_called_once_with(zmq.REQ)
+    client._send_poller = Mock(spec=["poll"])
     return client, mock_socket
 
 
@@ -21,11 +34,17 @@ def test_initialization(zmq_client):
     client, mock_socket = zmq_client
     assert client._address == "tcp://10.133.29.226:5556"
     mock_socket.connect.assert_called_once_with("tcp://10.133.29.226:5556")
+    client._poller.register.assert_any_call(mock_socket, zmq.POLLIN)
+    client._poller.register.assert_any_call(mock_socket, zmq.POLLOUT)
+    assert client._poll_timeout_ms == 2000
+    # El logger es de clase y conserva el nombre de la clase
+    assert client._logger is ZMQClient._logger
+    assert client._logger.name == "ZMQClient"
 
 
 def test_send_message_success(zmq_client):
     client, mock_socket = zmq_client
-    mock_socket.send_pyobj = MagicMock(return_value=None)  # Simular envío exitoso
+    mock_socket.send_pyobj.return_value = None  # Simular envío exitoso
 
     client._send("test_message")
     mock_socket.send_pyobj.assert_called_once_with("test_message")
@@ -33,38 +52,61 @@ def test_send_message_success(zmq_client):
 
 def test_send_message_timeout(zmq_client):
     client, mock_socket = zmq_client
-    mock_socket.send_pyobj = MagicMock(side_effect=zmq.ZMQError)  # Simular error
+    mock_socket.send_pyobj.side_effect = zmq.ZMQError  # Simular error
 
-    # Establecer el tiempo de espera para que se agote
-    client._timeout = 0.1
+    # El reloj avanza más allá del tiempo de espera tras el segundo intento,
+    # sin esperar en tiempo real
+    clock = patch("qmio.clients.monotonic", side_effect=[0.0, 0.0, client._timeout + 1])
 
     # Verificar que se lanza un TimeoutError después de varios intentos
-    with pytest.raises(TimeoutError):
+    with clock, pytest.raises(TimeoutError):
         client._send("test_message")
+    assert mock_socket.send_pyobj.call_count == 2
+    # Entre reintentos se espera a que el socket admita escritura
+    client._send_poller.poll.assert_called_with(timeout=10)
 
 
-def test_receive_message_success(zmq_client):
+def test_send_message_retry(zmq_client):
     client, mock_socket = zmq_client
-    mock_socket.recv_pyobj = MagicMock(return_value="received_message")  # Simular recepción exitosa
+    mock_socket.send_pyobj.side_effect = [zmq.ZMQError, None]
 
-    result = client._check_recieved()
-    assert result == "received_message"
+    client._send("test_message")
+    assert mock_socket.send_pyobj.call_count == 2
+    client._send_poller.poll.assert_called_once_with(timeout=10)
 
 
-def test_receive_message_failure(zmq_client):
+@pytest.mark.parametrize("recv,expected", [
+    ("received_message", "received_message"),  # Simular recepción exitosa
+    (zmq.ZMQError(), None),  # Simular error
+])
+def test_receive_message(zmq_client, recv, expected):
     client, mock_socket = zmq_client
-    mock_socket.recv_pyobj = MagicMock(side_effect=zmq.ZMQError)  # Simular error
+    mock_socket.recv_pyobj.side_effect = [recv]
 
-    result = client._check_recieved()
-    assert result is None
+    assert client._check_recieved() == expected
 
 
 def test_await_results_success(zmq_client):
     client, mock_socket = zmq_client
-    mock_socket.recv_pyobj = MagicMock(return_value="result")  # Simular recepción exitosa
+    mock_socket.recv_pyobj.return_value = "result"  # Simular recepción exitosa
+    client._poller.poll.return_value = [(mock_socket, zmq.POLLIN)]
+
+    result = client._await_results()
+    assert result == "result"
+    client._poller.poll.assert_called_once_with(timeout=2000)
+
+
+def test_await_results_waits_for_pollin(zmq_client):
+    client, mock_socket = zmq_client
+    mock_socket.recv_pyobj.return_value = "result"
+    # Los dos primeros polls vencen sin mensajes
+    client._poller.poll.side_effect = [[], [], [(mock_socket, zmq.POLLIN)]]
 
     result = client._await_results()
     assert result == "result"
+    assert client._poller.poll.call_count == 3
+    # Solo se lee del socket cuando hay algo disponible
+    mock_socket.recv_pyobj.assert_called_once()
 
 
 def test_close_socket(zmq_client):
@@ -72,12 +114,49 @@ def test_close_socket(zmq_client):
     # Cerrar el socket
     mock_socket.closed = False
     client.close()
-    # Verificar que se llamó a close() en el mock
-    mock_socket.close.assert_called_once()
+    # Verificar que se llamó a close() en el mock sin esperar mensajes
+    mock_socket.close.assert_called_once_with(linger=0)
+    # El contexto compartido no se destruye
+    client._context.destroy.assert_not_called()
     # Repetir la llamada a close no debería causar errores
     client.close()
 
 
+@patch('qmio.clients.atexit.register')
+@patch.object(clients, '_shared_context_classes', set())
+@patch.object(clients, '_context_teardown_registered', False)
+@patch('zmq.Context', autospec=True)
+def test_shared_context_teardown_registered_once(mock_context, mock_register):
+    first = clients._shared_context()
+    second = clients._shared_context()
+    # Todos los clientes usan el mismo contexto y se cierra una sola vez
+    assert first is second
+    mock_register.assert_called_once_with(clients._destroy_shared_context)
+
+
+@patch('qmio.clients.atexit.register')
+@patch.object(clients, '_shared_context_classes', set())
+@patch.object(clients, '_context_teardown_registered', False)
+@patch('zmq.asyncio.Context', autospec=True)
+@patch('zmq.Context', autospec=True)
+def test_shared_contexts_destroyed_at_exit(mock_context, mock_async_context, mock_register):
+    clients._shared_context()
+    clients._shared_context(zmq.asyncio.Context)
+    mock_register.assert_called_once_with(clients._destroy_shared_context)
+    # Al salir se destruyen tanto el contexto síncrono como el de asyncio
+    clients._destroy_shared_context()
+    mock_context.instance.return_value.destroy.assert_called_once_with(linger=0)
+    mock_async_context.instance.return_value.destroy.assert_called_once_with(linger=0)
+
+
+def test_context_manager_closes_socket(zmq_client):
+    client, mock_socket = zmq_client
+    mock_socket.closed = False
+    with client as c:
+        assert c is client
+    mock_socket.close.assert_called_once()
+
+
 # def test_destructor_calls_close(zmq_client):
 #     client, mock_socket = zmq_client
 #     mock_socket.closed = False
@@ -88,3 +167,112 @@ def test_close_socket(zmq_client):
 #     del client
 #     # Verifica que `close` fue llamado una vez en el mock
 #     mock_close.assert_called_once()
+
+
+@pytest.fixture
+def async_zmq_client(poller_autospec):
+    mock_socket = Mock(spec=SOCKET_API, closed=False)
+    mock_socket.send_pyobj = AsyncMock()
+    mock_socket.recv_pyobj = AsyncMock(return_value="result")
+    poller_autospec.reset_mock(return_value=True, side_effect=True)
+
+    with patch('zmq.asyncio.Context', autospec=True) as mock_context, \
+            patch('zmq.Poller', new=poller_autospec), \
+            patch.object(clients, '_shared_context_classes', set()) as contexts:
+        mock_context.instance.return_value.socket.return_value = mock_socket
+        client = AsyncZMQClient(address="tcp://10.133.29.226:5556")
+    # El contexto de asyncio también se destruye al salir
+    assert contexts == {mock_context}
+    return client, mock_socket
+
+
+def test_async_request(async_zmq_client):
+    client, mock_socket = async_zmq_client
+    mock_socket.connect.assert_called_once_with("tcp://10.133.29.226:5556")
+
+    assert asyncio.run(client.request("test_message")) == "result"
+    mock_socket.send_pyobj.assert_awaited_once_with("test_message")
+    mock_socket.recv_pyobj.assert_awaited_once()
+
+
+def test_async_requests_serialized(async_zmq_client):
+    client, mock_socket = async_zmq_client
+    order = []
+
+    async def send(message):
+        order.append(("send", message))
+        await asyncio.sleep(0)
+
+    async def recv():
+        order.append(("recv",))
+        await asyncio.sleep(0)
+        return "result"
+
+    mock_socket.send_pyobj.side_effect = send
+    mock_socket.recv_pyobj.side_effect = recv
+
+    async def main():
+        return await asyncio.gather(client.request("a"), client.request("b"))
+
+    assert asyncio.run(main()) == ["result", "result"]
+    # El socket REQ no admite dos peticiones a la vez
+    assert order == [("send", "a"), ("recv",), ("send", "b"), ("recv",)]
+
+
+def test_async_send_timeout(async_zmq_client):
+    client, mock_socket = async_zmq_client
+
+    async def never_sent(message):
+        await asyncio.sleep(10)
+
+    mock_socket.send_pyobj.side_effect = never_sent
+    client._timeout = 0.01
+    with pytest.raises(TimeoutError):
+        asyncio.run(client._send("test_message"))
+
+
+def test_async_requests_across_event_loops(async_zmq_client):
+    client, mock_socket = async_zmq_client
+
+    async def send(message):
+        await asyncio.sleep(0)
+
+    async def recv():
+        await asyncio.sleep(0)
+        return "result"
+
+    mock_socket.send_pyobj.side_effect = send
+    mock_socket.recv_pyobj.side_effect = recv
+
+    async def main():
+        return await asyncio.gather(client.request("a"), client.request("b"))
+
+    # El mismo cliente se reutiliza desde un segundo bucle de eventos
+    assert asyncio.run(main()) == ["result", "result"]
+    assert asyncio.run(main()) == ["result", "result"]
+
+
+def test_async_request_cancelled_resets_socket(async_zmq_client):
+    client, mock_socket = async_zmq_client
+
+    async def never_received():
+        await asyncio.sleep(10)
+
+    mock_socket.recv_pyobj.side_effect = never_received
+    new_socket = Mock(spec=SOCKET_API, closed=False)
+    new_socket.send_pyobj = AsyncMock()
+    new_socket.recv_pyobj = AsyncMock(return_value="result")
+    client._context.socket.return_value = new_socket
+
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(asyncio.wait_for(client.request("a"), 0.01))
+    # El socket REQ queda a la espera de la respuesta: se sustituye por otro
+    mock_socket.close.assert_called_once_with(linger=0)
+    new_socket.connect.assert_called_once_with("tcp://10.133.29.226:5556")
+    # Los pollers dejan de vigilar el socket cerrado
+    client._poller.unregister.assert_any_call(mock_socket)
+    client._send_poller.unregister.assert_any_call(mock_socket)
+    client._poller.register.assert_any_call(new_socket, zmq.POLLIN)
+    client._send_poller.register.assert_any_call(new_socket, zmq.POLLOUT)
+    assert asyncio.run(client.request("b")) == "result"
+    new_socket.send_pyobj.assert_awaited_once_with("b")